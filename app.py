@@ -9,6 +9,12 @@ from src import (
     PDFGenerator,
     Config
 )
+from src.generators.inference_service import get_inference_service
+from src.generators.warmup import start_warmup
+from src.utils import get_artifact_cache, get_embedding_cache, get_http_pool, get_model_registry
+from src.utils.cancellation import CancellationToken, cancellation_stats
+from src.utils.performance import step_latency_report
+from src.utils.range_server import get_range_server
 import time
 import random
 import os
@@ -19,6 +25,16 @@ st.set_page_config(
     layout="wide"
 )
 
+# Load the configured diffusion pipelines in the background once per server process,
+# so the first FLUX/Mochi request does not wait for from_pretrained. Inference workers
+# warm up their own pipelines instead.
+warmup = None
+if Config.PRELOAD_SETTINGS["enabled"]:
+    if Config.INFERENCE_SERVICE_SETTINGS["enabled"]:
+        get_inference_service()
+    else:
+        warmup = start_warmup()
+
 def initialize_generators():
     prodia = ProdiaGenerator(Config.PRODIA_API_KEY)
     pollinations = PollinationsGenerator()
@@ -30,9 +46,8 @@ def initialize_generators():
     return prodia, pollinations, stability, content_gen, pdf_gen, flux, mochi
 
 def cleanup_temp_files():
-    """Clean up temporary generated files and directories"""
-    temp_files = ["temp_flux_image.png", "temp_mochi_video.gif"]
-    temp_dirs = [Config.PDF_SETTINGS["temp_directory"]]
+    """Clean up temporary generated files"""
+    temp_files = ["temp_flux_image.png"]
     
     for file in temp_files:
         try:
@@ -40,18 +55,13 @@ def cleanup_temp_files():
                 os.remove(file)
         except Exception as e:
             st.error(f"Failed to clean up {file}: {str(e)}")
-            
-    for dir_path in temp_dirs:
-        try:
-            if os.path.exists(dir_path):
-                # Only remove files older than 24 hours
-                current_time = time.time()
-                for filename in os.listdir(dir_path):
-                    filepath = os.path.join(dir_path, filename)
-                    if current_time - os.path.getmtime(filepath) > 86400:  # 24 hours
-                        os.remove(filepath)
-        except Exception as e:
-            st.error(f"Failed to clean up directory {dir_path}: {str(e)}")
+
+def run_diffusion(kind, generate, profile, cancel_token, **kwargs):
+    """Run a FLUX/Mochi job in the inference worker processes when enabled, otherwise in this script"""
+    if Config.INFERENCE_SERVICE_SETTINGS["enabled"]:
+        job = get_inference_service().submit(kind, profile=profile, **kwargs)
+        return job.result(cancel_token=cancel_token)
+    return generate(cancel_token=cancel_token, **kwargs)
 
 def main():
     try:
@@ -71,6 +81,7 @@ def main():
             ["Image", "Video", "PDF Document"]
         )
         
+        service = None  # Only the Image/Video sidebar picks a service
         if generation_type in ["Image", "Video"]:
             service = st.sidebar.radio(
                 "Select Service",
@@ -84,18 +95,73 @@ def main():
                     list(Config.PRODIA_MODELS.keys())
                 )
                 model_id = Config.PRODIA_MODELS[model]
+                with st.sidebar.expander("Prodia jobs"):
+                    st.json(prodia.tracker.stats())
+                with st.sidebar.expander("Connection pools"):
+                    st.json(get_http_pool().stats())
             elif service in ["FLUX", "Mochi"]:
                 # Advanced settings for FLUX/Mochi
-                num_steps = st.sidebar.slider("Number of steps", 20, 100, 50)
+                preset = st.sidebar.selectbox(
+                    "Sampler preset",
+                    list(Config.SAMPLER_PRESETS.keys()) + ["Custom"]
+                )
+                if preset == "Custom":
+                    scheduler = st.sidebar.selectbox("Scheduler", list(Config.SCHEDULERS.keys()))
+                    num_steps = st.sidebar.slider("Number of steps", 1, 100, 50)
+                else:
+                    scheduler = Config.SAMPLER_PRESETS[preset]["scheduler"]
+                    num_steps = Config.SAMPLER_PRESETS[preset]["steps"]
+                    st.sidebar.caption(f"{scheduler} scheduler, {num_steps} steps")
                 guidance_scale = st.sidebar.slider("Guidance scale", 1.0, 20.0, 7.5)
+                # A fixed seed makes results reproducible and lets repeats come from the artifact cache
+                diffusion_seed = None
+                if not st.sidebar.checkbox("Random seed", value=True):
+                    diffusion_seed = int(st.sidebar.number_input("Seed", 0, 2**32 - 1, 0))
                 if service == "Mochi":
-                    num_frames = st.sidebar.slider("Number of frames", 8, 32, 16)
+                    # Long videos are generated in overlapping chunks, so memory stays flat
+                    long_video = st.sidebar.checkbox("Long video", value=False)
+                    if long_video:
+                        num_frames = st.sidebar.slider(
+                            "Number of frames", 32, Config.LONG_VIDEO_SETTINGS["max_frames"], 97
+                        )
+                    else:
+                        num_frames = st.sidebar.slider("Number of frames", 8, 32, 16)
+                    video_format = st.sidebar.selectbox(
+                        "Video format",
+                        list(Config.VIDEO_FORMATS.keys()),
+                        index=list(Config.VIDEO_FORMATS.keys()).index(Config.VIDEO_ENCODING_SETTINGS["container"])
+                    )
+                profile = st.sidebar.selectbox(
+                    "Performance profile",
+                    list(Config.PERFORMANCE_PROFILES.keys()),
+                    index=list(Config.PERFORMANCE_PROFILES.keys()).index(Config.DIFFUSION_SETTINGS["profile"])
+                )
+                flux.profile = mochi.profile = profile
+                flux.scheduler = mochi.scheduler = scheduler
+                with st.sidebar.expander("Model residency"):
+                    st.json(get_model_registry().stats())
+                with st.sidebar.expander("Step latency by profile"):
+                    st.json(step_latency_report())
+                with st.sidebar.expander("Reclaimed compute"):
+                    st.json(cancellation_stats())
+                with st.sidebar.expander("Artifact cache"):
+                    st.json(get_artifact_cache().stats())
+                with st.sidebar.expander("Prompt embedding cache"):
+                    st.json(get_embedding_cache().stats())
+                if Config.INFERENCE_SERVICE_SETTINGS["enabled"]:
+                    with st.sidebar.expander("Inference workers"):
+                        st.json(get_inference_service().stats())
+                if warmup is not None:
+                    with st.sidebar.expander("Model warm-up"):
+                        st.json(warmup.stats())
             else:
                 model = st.sidebar.selectbox(
                     "Select Model",
                     list(Config.POLLINATIONS_MODELS.keys())
                 )
                 model_id = Config.POLLINATIONS_MODELS[model]
+                with st.sidebar.expander("Connection pools"):
+                    st.json(get_http_pool().stats())
             
             # Video generation settings for other services
             if service not in ["FLUX", "Mochi"] and generation_type == "Video":
@@ -118,9 +184,14 @@ def main():
                 )
                 
                 use_random_seed = st.sidebar.checkbox("Use Random Seed", value=True)
+                with st.sidebar.expander("Stability engines"):
+                    st.json(stability.engines.stats())
         else:  # PDF Document
             st.subheader("Generate PDF Document")
             topic = st.text_input("Enter your document topic")
+            content_gen.bypass_cache = st.checkbox("Force fresh content (skip cache)", value=False)
+            # Streaming writes sections one after another; off, they are generated concurrently
+            stream_content = st.checkbox("Stream content as it is written (slower)", value=False)
             
             if st.button("Generate Document"):
                 if not topic:
@@ -139,42 +210,60 @@ def main():
                     st.write("Document Structure:")
                     st.json(structure)
                     
-                    # Generate content for each section
-                    contents = {}
-                    with st.spinner("Generating content..."):
-                        for section in structure["sections"]:
-                            section_content = content_gen.generate_section_content(
-                                section["heading"],
-                                section["subheadings"]
+                    if stream_content:
+                        # Render tokens as they arrive and lay out each finished section right away
+                        builder = pdf_gen.start_pdf(structure["title"])
+                        pdf_data = None
+                        try:
+                            for section in structure["sections"]:
+                                st.markdown(f"### {section['heading']}")
+                                section_content = {}
+                                placeholder = None
+                                for key, chunk in content_gen.stream_section_content(
+                                    section["heading"],
+                                    section["subheadings"]
+                                ):
+                                    if key not in section_content:
+                                        if key != "main":
+                                            st.markdown(f"#### {key}")
+                                        placeholder = st.empty()
+                                        section_content[key] = ""
+                                    section_content[key] += chunk
+                                    placeholder.markdown(section_content[key])
+                                
+                                builder.add_section(
+                                    section,
+                                    {key: text.strip() for key, text in section_content.items()}
+                                )
+                            
+                            with st.spinner("Finishing PDF..."):
+                                pdf_data = builder.finish()
+                        except Exception as e:
+                            # A section cut off mid-stream must not end up in the PDF
+                            st.error(f"Failed to generate section '{section['heading']}': {str(e)}")
+                    else:
+                        # Generate content for each section
+                        with st.spinner("Generating content..."):
+                            contents = content_gen.generate_document_content(structure["sections"])
+                        
+                        # Generate PDF
+                        with st.spinner("Creating PDF..."):
+                            pdf_data = pdf_gen.generate_pdf(
+                                structure["title"],
+                                structure["sections"],
+                                contents
                             )
-                            if section_content:
-                                contents[section["heading"]] = section_content
                     
-                    # Generate PDF
-                    with st.spinner("Creating PDF..."):
-                        os.makedirs(Config.PDF_SETTINGS["temp_directory"], exist_ok=True)
-                        output_path = os.path.join(
-                            Config.PDF_SETTINGS["temp_directory"],
-                            f"{int(time.time())}_{Config.PDF_SETTINGS['default_filename']}"
+                    # The PDF is rendered in memory and handed straight to the download button
+                    if pdf_data:
+                        st.download_button(
+                            "Download PDF",
+                            pdf_data,
+                            file_name=f"{int(time.time())}_{Config.PDF_SETTINGS['default_filename']}",
+                            mime="application/pdf"
                         )
-                        
-                        pdf_path = pdf_gen.generate_pdf(
-                            structure["title"],
-                            structure["sections"],
-                            contents,
-                            output_path
-                        )
-                        
-                        if pdf_path and os.path.exists(pdf_path):
-                            with open(pdf_path, "rb") as f:
-                                st.download_button(
-                                    "Download PDF",
-                                    f,
-                                    file_name=os.path.basename(pdf_path),
-                                    mime="application/pdf"
-                                )
-                        else:
-                            st.error("Failed to generate PDF")
+                    else:
+                        st.error("Failed to generate PDF")
 
         # Main interface
         prompt = st.text_area("Enter your prompt", height=100)
@@ -185,15 +274,37 @@ def main():
                 st.error("Please enter a prompt!")
                 return
                 
+            cancel_token = None
+            if service in ("FLUX", "Mochi"):
+                # Starting a run, or any rerun that interrupts it, abandons the previous generation
+                previous = st.session_state.get("cancel_token")
+                if previous is not None:
+                    previous.cancel()
+                progress = st.progress(0.0)
+                cancel_token = CancellationToken(on_progress=progress.progress)
+                st.session_state.cancel_token = cancel_token
+
             with st.spinner(f"Generating your {generation_type.lower()}..."):
                 try:
                     if generation_type == "Image":
                         if service == "FLUX":
-                            image = flux.generate_image(
+                            # Batched mode shares pipeline calls with concurrent sessions
+                            generate = (
+                                flux.generate_image_batched
+                                if Config.FLUX_SETTINGS["cross_session_batching"]
+                                else flux.generate_image
+                            )
+                            image = run_diffusion(
+                                "image",
+                                generate,
+                                profile,
+                                cancel_token,
                                 prompt=prompt,
                                 negative_prompt=negative_prompt,
                                 num_inference_steps=num_steps,
-                                guidance_scale=guidance_scale
+                                guidance_scale=guidance_scale,
+                                scheduler=scheduler,
+                                seed=diffusion_seed
                             )
                             if image:
                                 st.success("Image generated successfully!")
@@ -224,31 +335,31 @@ def main():
                                 st.image(media_url, caption=prompt)
                     elif generation_type == "Video":
                         if service == "Mochi":
-                            frames = mochi.generate_video(
+                            generate = mochi.generate_long_video if long_video else mochi.generate_video_encoded
+                            video = run_diffusion(
+                                "long_video" if long_video else "video",
+                                generate,
+                                profile,
+                                cancel_token,
                                 prompt=prompt,
                                 negative_prompt=negative_prompt,
                                 num_inference_steps=num_steps,
                                 guidance_scale=guidance_scale,
-                                num_frames=num_frames
+                                num_frames=num_frames,
+                                scheduler=scheduler,
+                                container=video_format,
+                                seed=diffusion_seed
                             )
-                            if frames:
+                            if video:
                                 st.success("Video generated successfully!")
-                                # Save as GIF
-                                temp_path = "temp_mochi_video.gif"
-                                try:
-                                    import imageio
-                                    imageio.mimsave(temp_path, frames, fps=8)
-                                    st.video(temp_path)
-                                    # Offer download
-                                    with open(temp_path, "rb") as f:
-                                        st.download_button(
-                                            "Download Video",
-                                            f,
-                                            file_name="mochi_generated_video.gif",
-                                            mime="image/gif"
-                                        )
-                                finally:
-                                    cleanup_temp_files()
+                                mime = Config.VIDEO_FORMATS[video_format]["mime"]
+                                st.video(video, format=mime)
+                                st.download_button(
+                                    "Download Video",
+                                    video,
+                                    file_name=f"mochi_generated_video.{video_format}",
+                                    mime=mime
+                                )
                         else:
                             seed = random.randint(0, 2**32 - 1) if use_random_seed else None
                             video_path = stability.generate_video(
@@ -261,9 +372,13 @@ def main():
                             
                             if video_path:
                                 st.success("Video generated successfully!")
-                                st.video(video_path)
-                                # Cleanup temporary file
-                                stability.cleanup_temp_files(video_path)
+                                if Config.STABILITY_SETTINGS["range_server"]:
+                                    # Streamed from disk with Range support; the server prunes old files
+                                    st.video(get_range_server().url_for(video_path))
+                                else:
+                                    st.video(video_path)
+                                    # Cleanup temporary file
+                                    stability.cleanup_temp_files(video_path)
                             else:
                                 st.error("Failed to generate video. Please try again.")
                 
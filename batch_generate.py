@@ -0,0 +1,183 @@
+"""
+Headless batch generation of PDF documents.
+
+Reads topics from a JSONL file (one ``{"topic": "...", "id": "..."}`` object or
+plain JSON string per line), writes one PDF per topic and records every finished
+document in a checkpoint file so an interrupted run can be resumed.
+
+    python batch_generate.py topics.jsonl --output-dir batch_output --concurrency 8
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import time
+from openai import AsyncOpenAI
+from src import ContentGenerator, PDFGenerator, Config
+
+_pdf_generator: Optional[PDFGenerator] = None
+
+def _render_pdf(title: str, sections: List[Dict], contents: Dict[str, Dict[str, str]], output_path: str) -> Optional[str]:
+    """Render one PDF inside a pool process, reusing that process's PDFGenerator."""
+    global _pdf_generator
+    if _pdf_generator is None:
+        _pdf_generator = PDFGenerator()
+    return _pdf_generator.generate_pdf(title, sections, contents, output_path)
+
+def _safe_id(doc_id: str) -> str:
+    # Ids become file names, so "../x" or "/abs" must not leave the output directory
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", doc_id).lstrip(".")
+    return safe or hashlib.sha1(doc_id.encode("utf-8")).hexdigest()[:12]
+
+def load_topics(path: str) -> List[Dict[str, str]]:
+    """
+    Read topics from a JSONL file, deriving a stable id from the topic when none is given.
+
+    Ids are reduced to characters safe in a file name.
+
+    Raises:
+        ValueError: If two topics end up with the same id, since their PDFs would overwrite each other
+    """
+    topics = []
+    seen = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"topic": item}
+            topic = item["topic"]
+            doc_id = _safe_id(str(item.get("id") or hashlib.sha1(topic.encode("utf-8")).hexdigest()[:12]))
+            if doc_id in seen:
+                raise ValueError(f"Duplicate topic id {doc_id!r} on lines {seen[doc_id]} and {line_number} of {path}")
+            seen[doc_id] = line_number
+            topics.append({"id": doc_id, "topic": topic})
+    return topics
+
+def load_checkpoint(path: str) -> Set[str]:
+    """Return the ids of documents already finished by a previous run."""
+    done = set()
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    done.add(json.loads(line)["id"])
+    return done
+
+class BatchRunner:
+    def __init__(self, output_dir: str, concurrency: int, render_workers: int):
+        self.output_dir = output_dir
+        self.checkpoint_path = os.path.join(output_dir, "checkpoint.jsonl")
+        self.concurrency = concurrency
+        self.render_workers = render_workers
+        self.content_gen = ContentGenerator()
+        self.completed = 0
+        self.failed = 0
+        self.started = 0.0
+
+    def _docs_per_minute(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.completed / elapsed * 60 if elapsed > 0 else 0.0
+
+    def _checkpoint(self, item: Dict[str, str], path: str, seconds: float):
+        with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"id": item["id"], "topic": item["topic"], "path": path, "seconds": round(seconds, 2)}) + "\n")
+
+    async def _generate(
+        self,
+        item: Dict[str, str],
+        semaphore: asyncio.Semaphore,
+        pool: ProcessPoolExecutor,
+        client: AsyncOpenAI,
+        request_limit: asyncio.Semaphore,
+        total: int,
+    ):
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                structure = await asyncio.to_thread(self.content_gen.generate_content_structure, item["topic"])
+                if not structure:
+                    raise Exception("Failed to generate document structure")
+
+                contents = await self.content_gen.agenerate_document_content(
+                    structure["sections"], client, request_limit
+                )
+                # Failed sections are left out of contents; don't checkpoint a partial document as done
+                missing = [section["heading"] for section in structure["sections"] if section["heading"] not in contents]
+                if missing:
+                    raise Exception(f"Failed to generate sections: {', '.join(missing)}")
+
+                # reportlab layout is CPU-bound, so it runs in the process pool
+                output_path = os.path.join(self.output_dir, f"{item['id']}.pdf")
+                pdf_path = await asyncio.get_running_loop().run_in_executor(
+                    pool,
+                    _render_pdf,
+                    structure["title"],
+                    structure["sections"],
+                    contents,
+                    output_path
+                )
+                if not pdf_path:
+                    raise Exception("Failed to generate PDF")
+
+            except Exception as e:
+                self.failed += 1
+                print(f"[{self.completed + self.failed}/{total}] {item['id']} failed: {str(e)}")
+                return
+
+            self.completed += 1
+            self._checkpoint(item, pdf_path, time.monotonic() - start)
+            print(
+                f"[{self.completed + self.failed}/{total}] {item['id']} -> {pdf_path} "
+                f"({self._docs_per_minute():.1f} docs/min)"
+            )
+
+    async def run(self, topics: List[Dict[str, str]]):
+        os.makedirs(self.output_dir, exist_ok=True)
+        done = load_checkpoint(self.checkpoint_path)
+        pending = [item for item in topics if item["id"] not in done]
+        print(f"{len(topics)} topics, {len(topics) - len(pending)} already done, {len(pending)} to generate")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # Every document's section requests share one client and one limit, so in-flight
+        # requests stay at max_concurrency however many documents run at once
+        request_limit = asyncio.Semaphore(self.content_gen.max_concurrency)
+        self.started = time.monotonic()
+        # spawn keeps the pool processes free of the parent's threads and locks
+        with ProcessPoolExecutor(
+            max_workers=self.render_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            async with AsyncOpenAI(api_key=Config.OPENAI_API_KEY, max_retries=0) as client:
+                await asyncio.gather(*(
+                    self._generate(item, semaphore, pool, client, request_limit, len(pending))
+                    for item in pending
+                ))
+
+        elapsed = time.monotonic() - self.started
+        print(
+            f"Finished {self.completed} documents ({self.failed} failed) in {elapsed:.1f}s, "
+            f"{self._docs_per_minute():.1f} docs/min"
+        )
+
+def main():
+    settings = Config.BATCH_SETTINGS
+    parser = argparse.ArgumentParser(description="Generate PDF documents in bulk from a JSONL topic list")
+    parser.add_argument("input", help="JSONL file with one topic per line")
+    parser.add_argument("--output-dir", default=settings["output_directory"], help="Where PDFs and the checkpoint are written")
+    parser.add_argument("--concurrency", type=int, default=settings["concurrency"], help="Documents generated at the same time")
+    parser.add_argument("--render-workers", type=int, default=settings["render_workers"], help="Processes used for PDF layout")
+    args = parser.parse_args()
+
+    runner = BatchRunner(args.output_dir, args.concurrency, args.render_workers)
+    asyncio.run(runner.run(load_topics(args.input)))
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,212 @@
 from diffusers import DiffusionPipeline
 from PIL import Image
-from typing import Optional
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+import io
+import os
+import queue
+import random
+import threading
+import time
 import torch
 import gc
+from src.utils.artifact_cache import ArtifactCache, get_artifact_cache
+from src.utils.config import Config
+from src.utils.embedding_cache import get_embedding_cache
+from src.utils.model_registry import get_model_registry, pipeline_lock
+from src.utils.cancellation import CancellationToken, GenerationCancelled
+from src.utils.performance import (
+    StepTimer,
+    apply_profile,
+    compose_step_callbacks,
+    get_profile,
+    inference_context,
+    load_kwargs,
+    record_step_latency,
+)
+from src.utils.preload import local_snapshot, pretrained_kwargs, timed
+from src.utils.schedulers import with_scheduler
+
+def _torch_generator(seed: int) -> torch.Generator:
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    return torch.Generator(device).manual_seed(seed)
 
 class FluxGenerator:
-    def __init__(self):
+    def __init__(self, profile: Optional[str] = None, use_cache: bool = True):
         self.model = "black-forest-labs/FLUX.1-dev"
         self.pipe = None
+        # Seeded results are reused from disk; unseeded requests are never cached
+        self.cache = get_artifact_cache() if use_cache and Config.ARTIFACT_CACHE_SETTINGS["enabled"] else None
+        # Text-encoder outputs are reused across requests instead of re-encoding repeated prompts
+        self.embedding_cache = get_embedding_cache() if Config.EMBEDDING_CACHE_SETTINGS["enabled"] else None
+        # Performance profile from Config.PERFORMANCE_PROFILES; can be changed between calls
+        self.profile = profile or Config.DIFFUSION_SETTINGS["profile"]
+        self.last_step_timer = None
+        # Sampler from Config.SCHEDULERS; "default" keeps the pipeline's own scheduler
+        self.scheduler = "default"
+
+    def _registry_key(self) -> str:
+        return f"{self.model}@{self.profile}"
+
+    def _load_pipeline(self) -> DiffusionPipeline:
+        key = self._registry_key()
+        try:
+            profile = get_profile(self.profile)
+            with timed(key, "snapshot"):
+                path = local_snapshot(self.model)
+            with timed(key, "from_pretrained"):
+                pipe = DiffusionPipeline.from_pretrained(path, **pretrained_kwargs(), **load_kwargs(profile))
+            if torch.cuda.is_available():
+                with timed(key, "to_device"):
+                    pipe = pipe.to("cuda")
+            with timed(key, "apply_profile"):
+                return apply_profile(pipe, profile)
+        except Exception as e:
+            raise Exception(f"Failed to load FLUX model: {str(e)}")
 
     def _load_model(self):
-        """Lazy loading of the model to save memory when not in use"""
-        if self.pipe is None:
-            try:
-                self.pipe = DiffusionPipeline.from_pretrained(self.model)
-                if torch.cuda.is_available():
-                    self.pipe = self.pipe.to("cuda")
-            except Exception as e:
-                raise Exception(f"Failed to load FLUX model: {str(e)}")
+        """Lazy loading of the model; it stays resident in the shared registry across reruns"""
+        self.pipe = get_model_registry().get(self._registry_key(), self._load_pipeline)
+        return self.pipe
+
+    def warm_up(self, num_inference_steps: Optional[int] = None) -> StepTimer:
+        """
+        Load the pipeline into the shared registry and run one tiny generation.
+
+        Used by the startup warm-up so the first real request finds the model
+        resident, with lazy initialisation and any compilation already done.
+        """
+        steps = num_inference_steps or Config.PRELOAD_SETTINGS["warmup_steps"]
+        try:
+            self._load_model()
+            with timed(self._registry_key(), "warmup_inference"):
+                self._run_pipe(
+                    prompt="warm-up",
+                    num_inference_steps=steps,
+                    height=256,
+                    width=256,
+                )
+            return self.last_step_timer
+        finally:
+            self._cleanup()
+
+    def _embed_text(self, text: str) -> Tuple[torch.Tensor, torch.Tensor]:
+        """T5 and pooled CLIP embeddings of one prompt, from the embedding cache when possible"""
+        def encode():
+            with torch.no_grad():
+                prompt_embeds, pooled_prompt_embeds, _ = self.pipe.encode_prompt(
+                    prompt=text, prompt_2=None, num_images_per_prompt=1
+                )
+            return prompt_embeds, pooled_prompt_embeds
+
+        return self.embedding_cache.get_or_compute((self._registry_key(), text), encode)
+
+    def _embed_texts(self, texts: List[str], repeats: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        embeds, pooled = zip(*(self._embed_text(text) for text in texts))
+        # Precomputed embeddings are not expanded by the pipeline, so repeat them per image here
+        return (
+            torch.cat(embeds).repeat_interleave(repeats, dim=0),
+            torch.cat(pooled).repeat_interleave(repeats, dim=0),
+        )
+
+    def _embed_prompts(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace prompt strings in pipeline arguments with cached embeddings"""
+        if self.embedding_cache is None or "prompt" not in kwargs:
+            return kwargs
+
+        kwargs = dict(kwargs)
+        prompts = kwargs.pop("prompt")
+        prompts = [prompts] if isinstance(prompts, str) else prompts
+        negative = kwargs.pop("negative_prompt", None)
+        repeats = kwargs.pop("num_images_per_prompt", 1) or 1
+
+        kwargs["prompt_embeds"], kwargs["pooled_prompt_embeds"] = self._embed_texts(prompts, repeats)
+        negatives = [negative] * len(prompts) if isinstance(negative, str) else negative
+        if negatives and any(negatives):
+            kwargs["negative_prompt_embeds"], kwargs["negative_pooled_prompt_embeds"] = self._embed_texts(
+                negatives, repeats
+            )
+        return kwargs
+
+    def _run_pipe(
+        self,
+        scheduler: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        **kwargs
+    ):
+        """Call the pipeline under the active profile and scheduler, recording per-step latency"""
+        pipe = with_scheduler(self.pipe, scheduler or self.scheduler)
+        # Sessions, the batch queue and warm-up share the resident pipeline, whose calls keep state on it
+        with pipeline_lock(self.pipe), inference_context(get_profile(self.profile)):
+            timer = StepTimer()
+            callback = timer
+            if cancel_token is not None:
+                steps = kwargs["num_inference_steps"]
+                cancel_token.raise_if_cancelled(steps_skipped=steps)
+                callback = compose_step_callbacks(timer, cancel_token.step_callback(steps, timer))
+            kwargs = self._embed_prompts(kwargs)
+            result = pipe(callback_on_step_end=callback, **kwargs)
+        self.last_step_timer = timer
+        record_step_latency(self.model, self.profile, timer)
+        return result
 
     def _cleanup(self):
-        """Clean up GPU memory after generation"""
-        if self.pipe is not None and torch.cuda.is_available():
-            self.pipe.to("cpu")
+        """Release cached GPU memory after generation, keeping the pipeline resident"""
+        if torch.cuda.is_available():
             torch.cuda.empty_cache()
             gc.collect()
 
+    def _image_key(
+        self,
+        prompt: str,
+        negative_prompt: Optional[str],
+        num_inference_steps: int,
+        guidance_scale: float,
+        scheduler: Optional[str],
+        seed: Optional[int],
+    ) -> Optional[str]:
+        """Artifact cache key of a request, or None if it is not cacheable"""
+        if self.cache is None or seed is None:
+            return None
+        return ArtifactCache.make_key(self.model, {
+            "prompt": prompt,
+            "negative_prompt": negative_prompt or "",
+            "num_inference_steps": num_inference_steps,
+            "guidance_scale": guidance_scale,
+            "scheduler": scheduler or self.scheduler,
+            # bf16 profiles change the output, so results are kept per profile
+            "profile": self.profile,
+            "seed": seed,
+        })
+
+    def _cached_image(self, key: Optional[str]) -> Optional[Image.Image]:
+        path = self.cache.get(key) if key else None
+        if path is None:
+            return None
+        try:
+            image = Image.open(path)
+            image.load()
+        except OSError:
+            # Evicted or damaged between the index lookup and the read: regenerate instead
+            self.cache.discard(key)
+            return None
+        return image
+
+    def _store_image(self, key: Optional[str], image: Image.Image):
+        if key:
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            self.cache.set(key, buffer.getvalue(), "png")
+
     def generate_image(
         self,
         prompt: str,
         negative_prompt: Optional[str] = None,
         num_inference_steps: int = 50,
         guidance_scale: float = 7.5,
+        scheduler: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        seed: Optional[int] = None,
     ) -> Optional[Image.Image]:
         """
         Generate an image using the FLUX.1 model.
@@ -41,6 +216,9 @@ class FluxGenerator:
             negative_prompt (str, optional): Things to avoid in the image
             num_inference_steps (int): Number of denoising steps (default: 50)
             guidance_scale (float): How closely to follow the prompt (default: 7.5)
+            scheduler (str, optional): Entry of Config.SCHEDULERS to sample with (default: the generator's)
+            cancel_token (CancellationToken, optional): Stops the run at the next step once cancelled
+            seed (int, optional): Makes the result reproducible and lets it be served from the artifact cache
 
         Returns:
             Optional[PIL.Image.Image]: Generated image or None if generation fails
@@ -48,25 +226,358 @@ class FluxGenerator:
         Raises:
             Exception: If there's an error during image generation
         """
+        key = self._image_key(prompt, negative_prompt, num_inference_steps, guidance_scale, scheduler, seed)
+        cached = self._cached_image(key)
+        if cached is not None:
+            return cached
+
         try:
             self._load_model()
             
             # Generate the image
-            result = self.pipe(
+            result = self._run_pipe(
+                scheduler=scheduler,
+                cancel_token=cancel_token,
                 prompt=prompt,
                 negative_prompt=negative_prompt,
                 num_inference_steps=num_inference_steps,
                 guidance_scale=guidance_scale,
+                generator=_torch_generator(seed) if seed is not None else None,
             )
             
             image = result.images[0]
             self._cleanup()  # Clean up GPU memory
+            self._store_image(key, image)
             return image
             
+        except GenerationCancelled:
+            self._cleanup()
+            raise
+
         except Exception as e:
             self._cleanup()  # Clean up GPU memory even on error
             raise Exception(f"Failed to generate image: {str(e)}")
 
+    def benchmark(self, profile: str, num_inference_steps: int = 4) -> StepTimer:
+        """
+        Run a short, low-resolution generation under ``profile`` and return its step timings.
+
+        Pass this to ``src.utils.performance.benchmark_profiles`` to compare profiles on a host.
+        """
+        generator = FluxGenerator(profile)
+        try:
+            generator._load_model()
+            generator._run_pipe(
+                prompt="benchmark",
+                num_inference_steps=num_inference_steps,
+                height=256,
+                width=256,
+            )
+            return generator.last_step_timer
+        finally:
+            generator._cleanup()
+
+    def _max_batch_size(self) -> int:
+        """Images per pipeline call that fit in currently free memory, capped by config"""
+        settings = Config.FLUX_SETTINGS
+        limit = settings["max_batch_size"]
+        per_image = settings["per_image_memory_gb"] * 1024 ** 3
+        try:
+            if torch.cuda.is_available():
+                free, _ = torch.cuda.mem_get_info()
+            else:
+                free = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+            limit = min(limit, int(free // per_image))
+        except (ValueError, OSError, AttributeError):
+            pass
+        return max(1, limit)
+
+    def generate_images(
+        self,
+        prompts: List[str],
+        negative_prompt: Optional[Union[str, List[str]]] = None,
+        num_inference_steps: int = 50,
+        guidance_scale: float = 7.5,
+        num_images_per_prompt: int = 1,
+        scheduler: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        seed: Optional[Union[int, List[Optional[int]]]] = None,
+    ) -> List[Image.Image]:
+        """
+        Generate images for several prompts, running them through the pipeline in micro-batches.
+
+        Args:
+            prompts (List[str]): The text prompts to generate images from
+            negative_prompt (str or List[str], optional): One negative prompt for all
+                prompts, or one per prompt
+            num_inference_steps (int): Number of denoising steps (default: 50)
+            guidance_scale (float): How closely to follow the prompt (default: 7.5)
+            num_images_per_prompt (int): Images generated for each prompt (default: 1)
+            scheduler (str, optional): Entry of Config.SCHEDULERS to sample with (default: the generator's)
+            cancel_token (CancellationToken, optional): Stops the run at the next step once cancelled
+            seed (int or List[int], optional): One seed for all prompts, or one per prompt (None
+                entries are random); image ``i`` of a prompt uses its seed + ``i``
+
+        Returns:
+            List[PIL.Image.Image]: Images in prompt order, ``num_images_per_prompt`` per prompt
+
+        Raises:
+            Exception: If there's an error during image generation
+        """
+        if isinstance(negative_prompt, list) and len(negative_prompt) != len(prompts):
+            raise ValueError("negative_prompt must have one entry per prompt")
+        if isinstance(seed, list):
+            if len(seed) != len(prompts):
+                raise ValueError("seed must have one entry per prompt")
+            seeds = [s if s is not None else random.randint(0, 2**32 - 1) for s in seed]
+        else:
+            seeds = None if seed is None else [seed] * len(prompts)
+
+        try:
+            self._load_model()
+
+            # Micro-batch size is re-evaluated per batch as free memory changes
+            images = []
+            start = 0
+            while start < len(prompts):
+                batch_size = max(1, self._max_batch_size() // num_images_per_prompt)
+                batch = prompts[start:start + batch_size]
+                if isinstance(negative_prompt, list):
+                    batch_negative = negative_prompt[start:start + batch_size]
+                elif negative_prompt:
+                    batch_negative = [negative_prompt] * len(batch)
+                else:
+                    batch_negative = None
+
+                generators = None
+                if seeds is not None:
+                    # One generator per image keeps results independent of how prompts are batched
+                    generators = [
+                        _torch_generator(batch_seed + i)
+                        for batch_seed in seeds[start:start + len(batch)]
+                        for i in range(num_images_per_prompt)
+                    ]
+
+                result = self._run_pipe(
+                    scheduler=scheduler,
+                    cancel_token=cancel_token,
+                    prompt=batch,
+                    negative_prompt=batch_negative,
+                    num_inference_steps=num_inference_steps,
+                    guidance_scale=guidance_scale,
+                    num_images_per_prompt=num_images_per_prompt,
+                    generator=generators,
+                )
+                images.extend(result.images)
+                start += len(batch)
+
+            self._cleanup()  # Clean up GPU memory
+            return images
+
+        except GenerationCancelled:
+            self._cleanup()
+            raise
+
+        except Exception as e:
+            self._cleanup()  # Clean up GPU memory even on error
+            raise Exception(f"Failed to generate images: {str(e)}")
+
+    def generate_image_batched(
+        self,
+        prompt: str,
+        negative_prompt: Optional[str] = None,
+        num_inference_steps: int = 50,
+        guidance_scale: float = 7.5,
+        scheduler: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        seed: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Image.Image:
+        """
+        Generate an image through the shared micro-batching queue.
+
+        Requests from other sessions with the same profile, steps, guidance and scheduler that
+        arrive within the batching window run in the same pipeline call.
+
+        Args:
+            prompt (str): The text prompt to generate the image from
+            negative_prompt (str, optional): Things to avoid in the image
+            num_inference_steps (int): Number of denoising steps (default: 50)
+            guidance_scale (float): How closely to follow the prompt (default: 7.5)
+            scheduler (str, optional): Entry of Config.SCHEDULERS to sample with (default: the generator's)
+            cancel_token (CancellationToken, optional): Stops the run at the next step once cancelled
+            seed (int, optional): Makes the result reproducible and lets it be served from the artifact cache
+            timeout (float, optional): Seconds to wait for the result
+
+        Returns:
+            PIL.Image.Image: Generated image
+
+        Raises:
+            Exception: If there's an error during image generation
+        """
+        key = self._image_key(prompt, negative_prompt, num_inference_steps, guidance_scale, scheduler, seed)
+        cached = self._cached_image(key)
+        if cached is not None:
+            return cached
+
+        # The queue renders with this generator's profile, so the cache key and latency stats match it
+        future = get_image_batch_queue().submit(
+            prompt, negative_prompt, num_inference_steps, guidance_scale, scheduler or self.scheduler,
+            cancel_token, seed, profile=self.profile
+        )
+        image = self._wait(future, cancel_token, timeout)
+        self._store_image(key, image)
+        return image
+
+    def _wait(
+        self,
+        future: Future,
+        cancel_token: Optional[CancellationToken],
+        timeout: Optional[float],
+    ) -> Image.Image:
+        if cancel_token is None:
+            return future.result(timeout=timeout)
+
+        # Wake up regularly so the caller's progress hook runs in its own thread
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            try:
+                return future.result(timeout=0.25)
+            except FutureTimeoutError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+                cancel_token.report_progress()
+
+
+class _ImageRequest(NamedTuple):
+    prompt: str
+    negative_prompt: str
+    num_inference_steps: int
+    guidance_scale: float
+    scheduler: str
+    profile: str
+    cancel_token: Optional[CancellationToken]
+    seed: Optional[int]
+    future: Future
+
+
+class ImageBatchQueue:
+    """
+    Collects concurrent image requests and runs compatible ones as one batch.
+
+    A background thread waits for a request, keeps collecting for a short
+    window, groups what arrived by (profile, steps, guidance, scheduler) and
+    hands each group to the ``FluxGenerator.generate_images`` of its profile.
+    Pipelines are fetched from the model registry per batch, so the queue never
+    keeps one alive after the registry evicts it.
+    """
+
+    def __init__(self, window_seconds: Optional[float] = None, max_batch_size: Optional[int] = None):
+        settings = Config.FLUX_SETTINGS
+        self.window_seconds = (
+            window_seconds if window_seconds is not None else settings["batch_window_seconds"]
+        )
+        self.max_batch_size = max_batch_size or settings["max_batch_size"]
+        self._generators: Dict[str, FluxGenerator] = {}
+        self._requests: "queue.Queue[_ImageRequest]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        prompt: str,
+        negative_prompt: Optional[str],
+        num_inference_steps: int,
+        guidance_scale: float,
+        scheduler: str = "default",
+        cancel_token: Optional[CancellationToken] = None,
+        seed: Optional[int] = None,
+        profile: Optional[str] = None,
+    ) -> Future:
+        """Queue a request and return a future for its image."""
+        future = Future()
+        self._requests.put(_ImageRequest(
+            prompt, negative_prompt or "", num_inference_steps, guidance_scale, scheduler,
+            profile or Config.DIFFUSION_SETTINGS["profile"], cancel_token, seed, future
+        ))
+        return future
+
+    def _generator(self, profile: str) -> FluxGenerator:
+        if profile not in self._generators:
+            self._generators[profile] = FluxGenerator(profile)
+        return self._generators[profile]
+
+    def _collect(self) -> List[_ImageRequest]:
+        batch = [self._requests.get()]
+        deadline = time.monotonic() + self.window_seconds
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            groups: Dict[Tuple[str, int, float, str], List[_ImageRequest]] = {}
+            for request in self._collect():
+                key = (request.profile, request.num_inference_steps, request.guidance_scale, request.scheduler)
+                groups.setdefault(key, []).append(request)
+
+            for (profile, steps, guidance, scheduler), requests in groups.items():
+                live = []
+                for request in requests:
+                    if request.cancel_token is not None and request.cancel_token.cancelled:
+                        request.future.set_exception(GenerationCancelled("Generation was cancelled"))
+                    else:
+                        live.append(request)
+                if not live:
+                    continue
+
+                # The batch only stops early once every request in it has been abandoned
+                tokens = [request.cancel_token or CancellationToken() for request in live]
+                generator = self._generator(profile)
+                try:
+                    images = generator.generate_images(
+                        [request.prompt for request in live],
+                        negative_prompt=[request.negative_prompt for request in live],
+                        num_inference_steps=steps,
+                        guidance_scale=guidance,
+                        scheduler=scheduler,
+                        cancel_token=CancellationToken.all_of(tokens),
+                        seed=(
+                            [request.seed for request in live]
+                            if any(request.seed is not None for request in live) else None
+                        ),
+                    )
+                except Exception as e:
+                    for request in live:
+                        request.future.set_exception(e)
+                    continue
+                finally:
+                    # generate_images loads from the registry; holding the pipe would defeat eviction
+                    generator.pipe = None
+
+                for request, image in zip(live, images):
+                    if request.cancel_token is not None and request.cancel_token.cancelled:
+                        request.future.set_exception(GenerationCancelled("Generation was cancelled"))
+                    else:
+                        request.future.set_result(image)
+
+_shared_batch_queue: Optional[ImageBatchQueue] = None
+_shared_lock = threading.Lock()
+
+def get_image_batch_queue() -> ImageBatchQueue:
+    """Return the process-wide micro-batching queue shared by every session."""
+    global _shared_batch_queue
+    with _shared_lock:
+        if _shared_batch_queue is None:
+            _shared_batch_queue = ImageBatchQueue()
+        return _shared_batch_queue
+
 # Example usage
 if __name__ == "__main__":
     generator = FluxGenerator()
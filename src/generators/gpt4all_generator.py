@@ -1,11 +1,33 @@
-from gpt4all import GPT4All
 from typing import Dict, List, Optional
 import json
+from src.utils.config import Config
+from src.utils.llm_cache import LLMCache, get_llm_cache
+from .gpt4all_worker import get_shared_worker
 
 class ContentGenerator:
-    def __init__(self):
-        # Initialize with GPT4All-J model
-        self.model = GPT4All("ggml-gpt4all-j-v1.3-groovy")
+    def __init__(self, use_cache: bool = True, bypass_cache: bool = False):
+        # GPT4All-J runs in a shared worker process that loads the weights once
+        self.model_name = Config.GPT4ALL_SETTINGS["model"]
+        self.worker = get_shared_worker(self.model_name)
+        # Responses are cached on disk; bypass_cache forces fresh output but still refreshes the cache
+        self.cache = get_llm_cache() if use_cache and Config.LLM_CACHE_SETTINGS["enabled"] else None
+        self.bypass_cache = bypass_cache
+
+    def _generate(self, prompt: str, max_tokens: int) -> str:
+        key = LLMCache.make_key(
+            self.model_name,
+            [{"role": "user", "content": prompt}],
+            {"max_tokens": max_tokens}
+        )
+        if self.cache is not None and not self.bypass_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        response = self.worker.generate(prompt, max_tokens=max_tokens)
+        if self.cache is not None:
+            self.cache.set(key, response)
+        return response
     
     def generate_content_structure(self, topic: str) -> Optional[Dict]:
         try:
@@ -24,7 +46,7 @@ class ContentGenerator:
             Make it comprehensive but concise."""
 
             # Generate and parse response
-            response = self.model.generate(structure_prompt, max_tokens=500)
+            response = self._generate(structure_prompt, max_tokens=500)
             # Extract JSON from response
             json_str = response[response.find("{"):response.rfind("}")+1]
             return json.loads(json_str)
@@ -40,14 +62,14 @@ class ContentGenerator:
             heading_prompt = f"""Write a detailed paragraph about "{heading}".
             Keep it informative and engaging. Be specific and factual."""
             
-            content["main"] = self.model.generate(heading_prompt, max_tokens=200)
+            content["main"] = self._generate(heading_prompt, max_tokens=200)
 
             # Generate content for each subheading
             for subheading in subheadings:
                 subheading_prompt = f"""Write a concise paragraph about "{subheading}" 
                 in the context of {heading}. Be specific and informative."""
                 
-                content[subheading] = self.model.generate(subheading_prompt, max_tokens=150)
+                content[subheading] = self._generate(subheading_prompt, max_tokens=150)
 
             return content
 
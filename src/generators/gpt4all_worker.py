@@ -0,0 +1,217 @@
+from concurrent.futures import Future
+from typing import Dict, Optional, Any
+import atexit
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from src.utils.config import Config
+
+def _serve(model_name: str, requests, responses, max_batch_size: int, batch_wait_seconds: float):
+    """Worker process loop: load the model once and answer prompts from the request queue."""
+    from gpt4all import GPT4All
+
+    try:
+        model = GPT4All(model_name)
+    except Exception as e:
+        responses.put(("error", None, f"Failed to load GPT4All model: {str(e)}"))
+        return
+    responses.put(("ready", None, None))
+
+    running = True
+    while running:
+        item = requests.get()
+        if item is None:
+            break
+
+        # Briefly collect whatever else is queued so compatible prompts run together
+        batch = [item]
+        deadline = time.monotonic() + batch_wait_seconds
+        while len(batch) < max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                item = requests.get(timeout=timeout) if timeout > 0 else requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                running = False
+                break
+            batch.append(item)
+
+        groups = {}
+        for request_id, prompt, params in batch:
+            groups.setdefault(tuple(sorted(params.items())), []).append((request_id, prompt))
+
+        for params, prompts in groups.items():
+            for request_id, prompt in prompts:
+                try:
+                    responses.put((request_id, model.generate(prompt, **dict(params)), None))
+                except Exception as e:
+                    responses.put((request_id, None, str(e)))
+            responses.put(("batch", len(prompts), None))
+
+class GPT4AllWorker:
+    """
+    Serves a GPT4All model from a dedicated process.
+
+    The weights are loaded once in the worker process; callers in any thread
+    submit prompts through a request queue and receive futures. Prompts that
+    arrive together are grouped by generation parameters and run back to back.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        max_batch_size: Optional[int] = None,
+        batch_wait_seconds: Optional[float] = None,
+    ):
+        settings = Config.GPT4ALL_SETTINGS
+        self.model_name = model_name or settings["model"]
+        self.max_batch_size = max_batch_size or settings["max_batch_size"]
+        self.batch_wait_seconds = (
+            batch_wait_seconds if batch_wait_seconds is not None else settings["batch_wait_seconds"]
+        )
+
+        self._context = multiprocessing.get_context("spawn")
+        self._requests = None
+        self._responses = None
+        self._process = None
+        self._dispatcher = None
+        self._ready = threading.Event()
+        self._load_error = None
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "batches": 0}
+
+    def start(self):
+        """Start the worker process if it is not already running."""
+        with self._lock:
+            if self._process is not None and self._process.is_alive():
+                return
+
+            self._ready.clear()
+            self._load_error = None
+            self._requests = self._context.Queue()
+            self._responses = self._context.Queue()
+            self._process = self._context.Process(
+                target=_serve,
+                args=(
+                    self.model_name,
+                    self._requests,
+                    self._responses,
+                    self.max_batch_size,
+                    self.batch_wait_seconds,
+                ),
+                daemon=True,
+            )
+            self._process.start()
+            self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch(self):
+        """Resolve futures from the worker's responses until the process exits."""
+        process, responses = self._process, self._responses
+        while True:
+            try:
+                request_id, result, error = responses.get(timeout=1.0)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                self._fail_pending("GPT4All worker process exited")
+                return
+
+            if request_id == "ready":
+                self._ready.set()
+                continue
+            if request_id == "error":
+                self._load_error = error
+                self._ready.set()
+                self._fail_pending(error)
+                return
+            if request_id == "batch":
+                with self._lock:
+                    self._stats["batches"] += 1
+                continue
+
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+                self._stats["failed" if error else "completed"] += 1
+            if future is None:
+                continue
+            if error:
+                future.set_exception(Exception(error))
+            else:
+                future.set_result(result)
+
+    def _fail_pending(self, message: str):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._stats["failed"] += len(pending)
+        for future in pending.values():
+            future.set_exception(Exception(message))
+
+    def submit(self, prompt: str, **params: Any) -> Future:
+        """Queue a prompt for the worker and return a future for the generated text."""
+        self.start()
+        if self._load_error:
+            raise Exception(self._load_error)
+
+        future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            self._stats["submitted"] += 1
+        self._requests.put((request_id, prompt, params))
+        return future
+
+    def generate(self, prompt: str, timeout: Optional[float] = None, **params: Any) -> str:
+        """Generate text for ``prompt``, blocking until the worker answers."""
+        if timeout is None:
+            timeout = Config.GPT4ALL_SETTINGS["request_timeout"]
+        return self.submit(prompt, **params).result(timeout=timeout)
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until the model has loaded in the worker process."""
+        self.start()
+        return self._ready.wait(timeout) and self._load_error is None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request and batch counters for the worker."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        stats["ready"] = self._ready.is_set() and self._load_error is None
+        stats["alive"] = self._process is not None and self._process.is_alive()
+        return stats
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop the worker process and fail any requests still waiting on it."""
+        with self._lock:
+            process, requests = self._process, self._requests
+            self._process = None
+        if process is None:
+            return
+
+        if process.is_alive():
+            requests.put(None)
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._fail_pending("GPT4All worker was shut down")
+
+_shared_workers: Dict[str, GPT4AllWorker] = {}
+_shared_lock = threading.Lock()
+
+def get_shared_worker(model_name: Optional[str] = None) -> GPT4AllWorker:
+    """Return the process-wide worker for ``model_name``, starting it on first use."""
+    model_name = model_name or Config.GPT4ALL_SETTINGS["model"]
+    with _shared_lock:
+        worker = _shared_workers.get(model_name)
+        if worker is None:
+            worker = GPT4AllWorker(model_name)
+            _shared_workers[model_name] = worker
+            atexit.register(worker.shutdown)
+    worker.start()
+    return worker
@@ -0,0 +1,352 @@
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional
+import atexit
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from src.utils.cancellation import CancellationToken, GenerationCancelled
+from src.utils.config import Config
+
+# Job kind -> (generator, method) run by the worker
+JOB_KINDS = {
+    "image": ("flux", "generate_image"),
+    "video": ("mochi", "generate_video_encoded"),
+    "long_video": ("mochi", "generate_long_video"),
+}
+
+def _listen_for_cancel(control, current: Dict[str, Any], cancelled: set):
+    """Worker thread: cancel the running job, or remember a queued one, when the front end asks."""
+    while True:
+        job_id = control.get()
+        if job_id is None:
+            return
+        cancelled.add(job_id)
+        if current.get("job_id") == job_id:
+            current["token"].cancel()
+
+def _serve(worker_id: int, jobs, control, responses, device: Optional[str], num_threads: int):
+    """Worker process loop: own one FluxGenerator/MochiGenerator pair and run jobs from the shared queue."""
+    # torch is already imported here (unpickling _serve imports src.generators), but CUDA
+    # initialises lazily, so the device mask still applies before the first CUDA call.
+    # OMP_NUM_THREADS may be read too late, hence torch.set_num_threads below.
+    if device is not None:
+        os.environ["CUDA_VISIBLE_DEVICES"] = device
+    os.environ["OMP_NUM_THREADS"] = str(num_threads)
+
+    import torch
+    from .flux_generator import FluxGenerator
+    from .mochi_generator import MochiGenerator
+
+    torch.set_num_threads(num_threads)
+    generators = {"flux": FluxGenerator(), "mochi": MochiGenerator()}
+    current: Dict[str, Any] = {}
+    cancelled = set()
+    threading.Thread(target=_listen_for_cancel, args=(control, current, cancelled), daemon=True).start()
+
+    stats = {"jobs": 0, "failed": 0, "cancelled": 0, "busy_seconds": 0.0, "started_at": time.time()}
+    responses.put(("stats", worker_id, dict(stats)))
+    if Config.PRELOAD_SETTINGS["enabled"]:
+        for name in Config.PRELOAD_SETTINGS["models"]:
+            try:
+                generators[name].warm_up()
+            except Exception as e:
+                print(f"Error warming up {name} in worker {worker_id}: {str(e)}")
+    while True:
+        item = jobs.get()
+        if item is None:
+            break
+
+        job_id, kind, profile, kwargs = item
+        # Jobs leave the queue in id order, so cancels for older ids were meant for other workers
+        cancelled.difference_update([cancelled_id for cancelled_id in list(cancelled) if cancelled_id < job_id])
+        token = CancellationToken(
+            on_progress=lambda fraction, job_id=job_id: responses.put(("progress", job_id, fraction))
+        )
+        current.update(job_id=job_id, token=token)
+        if job_id in cancelled:
+            cancelled.discard(job_id)
+            token.cancel()
+        responses.put(("started", job_id, worker_id))
+        start = time.perf_counter()
+        try:
+            generator_name, method = JOB_KINDS[kind]
+            generator = generators[generator_name]
+            if profile:
+                generator.profile = profile
+            result = getattr(generator, method)(cancel_token=token, **kwargs)
+            responses.put((job_id, result, None))
+        except GenerationCancelled as e:
+            stats["cancelled"] += 1
+            responses.put((job_id, None, ("GenerationCancelled", str(e))))
+        except Exception as e:
+            stats["failed"] += 1
+            responses.put((job_id, None, (type(e).__name__, str(e))))
+        finally:
+            current.clear()
+            cancelled.discard(job_id)
+            stats["jobs"] += 1
+            stats["busy_seconds"] += time.perf_counter() - start
+            responses.put(("stats", worker_id, dict(stats)))
+
+class InferenceJob:
+    """A job submitted to the inference service."""
+
+    def __init__(self, service: "InferenceService", job_id: int, kind: str):
+        self.id = job_id
+        self.kind = kind
+        self.future = Future()
+        self.progress = 0.0
+        self.worker: Optional[int] = None
+        self.cancel_sent = False
+        self._service = service
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def cancel(self):
+        """Stop the job, whether it is still queued or already running in a worker."""
+        self._service.cancel(self)
+
+    def result(self, timeout: Optional[float] = None, cancel_token: Optional[CancellationToken] = None) -> Any:
+        """
+        Wait for the job's result.
+
+        With a ``cancel_token`` the wait polls, mirrors the job's progress into
+        the token and reports it from the calling thread; cancelling the token
+        (or its progress hook raising, e.g. on a Streamlit rerun) cancels the job.
+
+        Raises:
+            GenerationCancelled: If the job was cancelled
+            Exception: If the job failed in the worker
+        """
+        if cancel_token is None:
+            return self.future.result(timeout=timeout)
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            try:
+                return self.future.result(timeout=0.25)
+            except FutureTimeoutError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+            cancel_token.progress = self.progress
+            try:
+                cancel_token.report_progress()
+            except BaseException:
+                self.cancel()
+                raise
+            if cancel_token.cancelled:
+                self.cancel()
+
+class InferenceService:
+    """
+    Runs FLUX and Mochi inference in a pool of worker processes.
+
+    Every worker owns its own generators and model registry, and pulls jobs
+    from one shared queue, so an idle worker always takes the next job and a
+    long video only occupies the worker running it. With several GPUs the
+    workers are spread across them; on CPU the cores are split between
+    workers. Each worker reports how much of its lifetime it spent busy.
+    """
+
+    def __init__(self, num_workers: Optional[int] = None, profile: Optional[str] = None):
+        settings = Config.INFERENCE_SERVICE_SETTINGS
+        self.num_workers = num_workers or settings["num_workers"]
+        self.profile = profile or settings["profile"]
+        self._context = multiprocessing.get_context("spawn")
+        self._jobs = None
+        self._responses = None
+        self._workers: List[Dict[str, Any]] = []
+        self._dispatcher = None
+        self._pending: Dict[int, InferenceJob] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    def _devices(self) -> List[Optional[str]]:
+        devices = Config.INFERENCE_SERVICE_SETTINGS["devices"]
+        if devices is None:
+            try:
+                import torch
+                devices = [str(i) for i in range(torch.cuda.device_count())]
+            except ImportError:
+                devices = []
+        if not devices:
+            return [None] * self.num_workers
+        return [devices[i % len(devices)] for i in range(self.num_workers)]
+
+    def _spawn(self, worker_id: int, device: Optional[str]) -> Dict[str, Any]:
+        control = self._context.Queue()
+        num_threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+        process = self._context.Process(
+            target=_serve,
+            args=(worker_id, self._jobs, control, self._responses, device, num_threads),
+            daemon=True,
+        )
+        process.start()
+        return {"process": process, "control": control, "device": device, "job": None, "stats": {}}
+
+    def start(self):
+        """Start the worker processes if they are not already running."""
+        with self._lock:
+            if self._workers:
+                return
+            self._jobs = self._context.Queue()
+            self._responses = self._context.Queue()
+            self._workers = [self._spawn(i, device) for i, device in enumerate(self._devices())]
+            self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch(self):
+        """Resolve jobs from the workers' responses and replace workers that die."""
+        responses = self._responses
+        last_check = time.monotonic()
+        while True:
+            # Checked on a clock rather than when the queue goes quiet, which busy workers may never let happen
+            if time.monotonic() - last_check >= 1.0:
+                if not self._workers:
+                    return
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                job_id, result, error = responses.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+            with self._lock:
+                if job_id == "stats":
+                    if result < len(self._workers):
+                        self._workers[result]["stats"] = error
+                    continue
+                if job_id == "started":
+                    job = self._pending.get(result)
+                    if job is not None:
+                        job.worker = error
+                        self._workers[error]["job"] = result
+                    continue
+                if job_id == "progress":
+                    job = self._pending.get(result)
+                    if job is not None:
+                        job.progress = error
+                    continue
+
+                job = self._pending.pop(job_id, None)
+                if job is not None and job.worker is not None and self._workers[job.worker]["job"] == job_id:
+                    self._workers[job.worker]["job"] = None
+                if error is None:
+                    self._stats["completed"] += 1
+                elif error[0] == "GenerationCancelled":
+                    self._stats["cancelled"] += 1
+                else:
+                    self._stats["failed"] += 1
+            if job is None:
+                continue
+            if error is None:
+                job.progress = 1.0
+                job.future.set_result(result)
+            elif error[0] == "GenerationCancelled":
+                job.future.set_exception(GenerationCancelled(error[1]))
+            else:
+                job.future.set_exception(Exception(error[1]))
+
+    def _check_workers(self):
+        """Fail the job of a worker that exited and start a replacement."""
+        failed = []
+        with self._lock:
+            for worker_id, worker in enumerate(self._workers):
+                if worker["process"].is_alive():
+                    continue
+                job = self._pending.pop(worker["job"], None) if worker["job"] is not None else None
+                if job is not None:
+                    self._stats["failed"] += 1
+                    failed.append(job)
+                self._workers[worker_id] = self._spawn(worker_id, worker["device"])
+        for job in failed:
+            job.future.set_exception(Exception("Inference worker process exited"))
+
+    def submit(self, kind: str, profile: Optional[str] = None, **kwargs: Any) -> InferenceJob:
+        """
+        Queue a job for the next free worker.
+
+        Args:
+            kind (str): Entry of JOB_KINDS, e.g. "image" or "video"
+            profile (str, optional): Performance profile the worker's generator uses
+            **kwargs: Arguments of the generator method, e.g. prompt and num_inference_steps
+
+        Returns:
+            InferenceJob: Handle to poll, wait on or cancel
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self.start()
+
+        with self._lock:
+            job = InferenceJob(self, next(self._ids), kind)
+            self._pending[job.id] = job
+            self._stats["submitted"] += 1
+            # Queued under the lock so ids enter the queue in order; workers rely on that to prune cancels
+            self._jobs.put((job.id, kind, profile or self.profile, kwargs))
+        return job
+
+    def cancel(self, job: InferenceJob):
+        """Cancel a job; a running job stops at its next denoising step."""
+        with self._lock:
+            if job.id not in self._pending or job.cancel_sent:
+                return
+            job.cancel_sent = True
+            if job.worker is None:
+                # Still queued: the worker will see the cancel as soon as it picks the job up
+                for worker in self._workers:
+                    worker["control"].put(job.id)
+            else:
+                self._workers[job.worker]["control"].put(job.id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return job counters and per-worker utilization."""
+        now = time.time()
+        with self._lock:
+            workers = []
+            for worker_id, worker in enumerate(self._workers):
+                stats = dict(worker["stats"])
+                uptime = now - stats.pop("started_at", now)
+                stats.update(
+                    worker=worker_id,
+                    device=worker["device"],
+                    alive=worker["process"].is_alive(),
+                    running_job=worker["job"],
+                    utilization=stats.get("busy_seconds", 0.0) / uptime if uptime > 0 else 0.0,
+                )
+                workers.append(stats)
+            queued = sum(job.worker is None for job in self._pending.values())
+            return dict(self._stats, queued=queued, workers=workers)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop every worker and fail jobs that have not finished."""
+        with self._lock:
+            workers, self._workers = self._workers, []
+            pending, self._pending = self._pending, {}
+        for worker in workers:
+            self._jobs.put(None)
+            worker["control"].put(None)
+        for worker in workers:
+            worker["process"].join(timeout)
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+        for job in pending.values():
+            job.future.set_exception(Exception("Inference service was shut down"))
+
+_shared_service: Optional[InferenceService] = None
+_shared_lock = threading.Lock()
+
+def get_inference_service() -> InferenceService:
+    """Return the process-wide inference service, starting its workers on first use."""
+    global _shared_service
+    with _shared_lock:
+        if _shared_service is None:
+            _shared_service = InferenceService()
+            atexit.register(_shared_service.shutdown)
+    _shared_service.start()
+    return _shared_service
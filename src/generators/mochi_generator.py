@@ -1,32 +1,205 @@
 from diffusers import DiffusionPipeline
 from PIL import Image
-from typing import Optional, List
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, List, Tuple, Union
+import io
+import math
+import numpy as np
 import torch
 import imageio
 import gc
+from src.utils.artifact_cache import ArtifactCache, get_artifact_cache
+from src.utils.config import Config
+from src.utils.embedding_cache import get_embedding_cache
+from src.utils.frame_buffer import FrameBuffer
+from src.utils.model_registry import get_model_registry, pipeline_lock
+from src.utils.cancellation import CancellationToken, GenerationCancelled
+from src.utils.performance import (
+    StepTimer,
+    apply_profile,
+    compose_step_callbacks,
+    get_profile,
+    inference_context,
+    load_kwargs,
+    record_step_latency,
+)
+from src.utils.preload import local_snapshot, pretrained_kwargs, timed
+from src.utils.schedulers import with_scheduler
+from src.utils.video_encoder import VideoEncoder
+
+def _torch_generator(seed: int) -> torch.Generator:
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    return torch.Generator(device).manual_seed(seed)
+
+def _crossfade(tail: np.ndarray, head: np.ndarray) -> np.ndarray:
+    """Linearly blend the held-back frames of one chunk into the first frames of the next"""
+    weights = np.linspace(0.0, 1.0, len(tail) + 2, dtype=np.float32)[1:-1, None, None, None]
+    return (tail * (1.0 - weights) + head * weights).round().astype(np.uint8)
 
 class MochiGenerator:
-    def __init__(self):
+    def __init__(self, profile: Optional[str] = None, use_cache: bool = True):
         self.model = "genmo/mochi-1-preview"
         self.pipe = None
+        # Seeded results are reused from disk; unseeded requests are never cached
+        self.cache = get_artifact_cache() if use_cache and Config.ARTIFACT_CACHE_SETTINGS["enabled"] else None
+        # Text-encoder outputs are reused across requests instead of re-encoding repeated prompts
+        self.embedding_cache = get_embedding_cache() if Config.EMBEDDING_CACHE_SETTINGS["enabled"] else None
+        # Performance profile from Config.PERFORMANCE_PROFILES; can be changed between calls
+        self.profile = profile or Config.DIFFUSION_SETTINGS["profile"]
+        self.last_step_timer = None
+        # Sampler from Config.SCHEDULERS; "default" keeps the pipeline's own scheduler
+        self.scheduler = "default"
+
+    def _registry_key(self) -> str:
+        return f"{self.model}@{self.profile}"
+
+    def _load_pipeline(self) -> DiffusionPipeline:
+        key = self._registry_key()
+        try:
+            profile = get_profile(self.profile)
+            with timed(key, "snapshot"):
+                path = local_snapshot(self.model)
+            with timed(key, "from_pretrained"):
+                pipe = DiffusionPipeline.from_pretrained(path, **pretrained_kwargs(), **load_kwargs(profile))
+            if torch.cuda.is_available():
+                with timed(key, "to_device"):
+                    pipe = pipe.to("cuda")
+            with timed(key, "apply_profile"):
+                return apply_profile(pipe, profile)
+        except Exception as e:
+            raise Exception(f"Failed to load Mochi model: {str(e)}")
 
     def _load_model(self):
-        """Lazy loading of the model to save memory when not in use"""
-        if self.pipe is None:
-            try:
-                self.pipe = DiffusionPipeline.from_pretrained(self.model)
-                if torch.cuda.is_available():
-                    self.pipe = self.pipe.to("cuda")
-            except Exception as e:
-                raise Exception(f"Failed to load Mochi model: {str(e)}")
+        """Lazy loading of the model; it stays resident in the shared registry across reruns"""
+        self.pipe = get_model_registry().get(self._registry_key(), self._load_pipeline)
+        return self.pipe
+
+    def warm_up(self, num_inference_steps: Optional[int] = None) -> StepTimer:
+        """
+        Load the pipeline into the shared registry and run one tiny generation.
+
+        Used by the startup warm-up so the first real request finds the model
+        resident, with lazy initialisation and any compilation already done.
+        """
+        steps = num_inference_steps or Config.PRELOAD_SETTINGS["warmup_steps"]
+        try:
+            self._load_model()
+            with timed(self._registry_key(), "warmup_inference"):
+                self._run_pipe(
+                    prompt="warm-up",
+                    num_inference_steps=steps,
+                    height=256,
+                    width=256,
+                    # Fewest frames that still run the VAE's temporal upsampling (6k + 1)
+                    num_frames=7,
+                )
+            return self.last_step_timer
+        finally:
+            self._cleanup()
+
+    def _embed_text(self, text: str) -> Tuple[torch.Tensor, torch.Tensor]:
+        """T5 embeddings and attention mask of one prompt, from the embedding cache when possible"""
+        def encode():
+            with torch.no_grad():
+                prompt_embeds, prompt_attention_mask, _, _ = self.pipe.encode_prompt(
+                    prompt=text, do_classifier_free_guidance=False
+                )
+            return prompt_embeds, prompt_attention_mask
+
+        return self.embedding_cache.get_or_compute((self._registry_key(), text), encode)
+
+    def _embed_prompts(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace prompt strings in pipeline arguments with cached embeddings"""
+        if self.embedding_cache is None or "prompt" not in kwargs:
+            return kwargs
+
+        kwargs = dict(kwargs)
+        kwargs["prompt_embeds"], kwargs["prompt_attention_mask"] = self._embed_text(kwargs.pop("prompt"))
+        # Always supplied, so classifier-free guidance never falls back to encoding "" itself
+        negative = kwargs.pop("negative_prompt", None) or ""
+        kwargs["negative_prompt_embeds"], kwargs["negative_prompt_attention_mask"] = self._embed_text(negative)
+        return kwargs
+
+    def _run_pipe(
+        self,
+        scheduler: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        **kwargs
+    ):
+        """Call the pipeline under the active profile and scheduler, recording per-step latency"""
+        pipe = with_scheduler(self.pipe, scheduler or self.scheduler)
+        # Sessions, the batch queue and warm-up share the resident pipeline, whose calls keep state on it
+        with pipeline_lock(self.pipe), inference_context(get_profile(self.profile)):
+            timer = StepTimer()
+            callback = timer
+            if cancel_token is not None:
+                steps = kwargs["num_inference_steps"]
+                cancel_token.raise_if_cancelled(steps_skipped=steps)
+                callback = compose_step_callbacks(timer, cancel_token.step_callback(steps, timer))
+            kwargs = self._embed_prompts(kwargs)
+            result = pipe(callback_on_step_end=callback, **kwargs)
+        self.last_step_timer = timer
+        record_step_latency(self.model, self.profile, timer)
+        return result
 
     def _cleanup(self):
-        """Clean up GPU memory after generation"""
-        if self.pipe is not None and torch.cuda.is_available():
-            self.pipe.to("cpu")
+        """Release cached GPU memory after generation, keeping the pipeline resident"""
+        if torch.cuda.is_available():
             torch.cuda.empty_cache()
             gc.collect()
 
+    def _video_key(self, seed: Optional[int], **params: Any) -> Optional[str]:
+        """Artifact cache key of a request, or None if it is not cacheable"""
+        if self.cache is None or seed is None:
+            return None
+        params["negative_prompt"] = params["negative_prompt"] or ""
+        params["scheduler"] = params["scheduler"] or self.scheduler
+        # bf16 profiles change the output, so results are kept per profile
+        return ArtifactCache.make_key(self.model, dict(params, profile=self.profile, seed=seed))
+
+    def _frames_from_cache(
+        self, key: Optional[str], output_type: str, shared_memory: bool
+    ) -> Optional[Union[List[Image.Image], FrameBuffer]]:
+        path = self.cache.get(key) if key else None
+        if path is None:
+            return None
+        try:
+            array = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            # Evicted or damaged between the index lookup and the read: regenerate instead
+            self.cache.discard(key)
+            return None
+        if output_type == "pil":
+            return [Image.fromarray(frame) for frame in array]
+        buffer = FrameBuffer(array.shape, shared=shared_memory)
+        buffer.array[...] = array
+        return buffer
+
+    def _cached_video(self, key: Optional[str]) -> Optional[bytes]:
+        path = self.cache.get(key) if key else None
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            self.cache.discard(key)
+            return None
+
+    def _store_frames(self, key: Optional[str], frames: Union[List[Image.Image], FrameBuffer]):
+        if key:
+            array = frames.array if isinstance(frames, FrameBuffer) else np.stack([np.asarray(f) for f in frames])
+            data = io.BytesIO()
+            np.save(data, array)
+            self.cache.set(key, data.getvalue(), "npy")
+
+    def _to_frame_buffer(self, video: torch.Tensor, shared_memory: bool) -> FrameBuffer:
+        """Quantize a (frames, channels, height, width) float clip straight into a uint8 buffer"""
+        frames = video.mul(255).round_().clamp_(0, 255).to(torch.uint8).permute(0, 2, 3, 1)
+        buffer = FrameBuffer(tuple(frames.shape), shared=shared_memory)
+        torch.from_numpy(buffer.array).copy_(frames)
+        return buffer
+
     def generate_video(
         self,
         prompt: str,
@@ -34,7 +207,12 @@ class MochiGenerator:
         num_inference_steps: int = 50,
         guidance_scale: float = 7.5,
         num_frames: int = 16,
-    ) -> List[Image.Image]:
+        scheduler: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        output_type: str = "pil",
+        shared_memory: bool = False,
+        seed: Optional[int] = None,
+    ) -> Union[List[Image.Image], FrameBuffer]:
         """
         Generate a video using the Mochi model.
 
@@ -44,39 +222,359 @@ class MochiGenerator:
             num_inference_steps (int): Number of denoising steps (default: 50)
             guidance_scale (float): How closely to follow the prompt (default: 7.5)
             num_frames (int): Number of frames to generate (default: 16)
+            scheduler (str, optional): Entry of Config.SCHEDULERS to sample with (default: the generator's)
+            cancel_token (CancellationToken, optional): Stops the run at the next step once cancelled
+            output_type (str): "pil" for a list of images, "array" for one contiguous uint8 FrameBuffer
+            shared_memory (bool): Back the FrameBuffer with shared memory (only with output_type="array")
+            seed (int, optional): Makes the result reproducible and lets it be served from the artifact cache
 
         Returns:
-            List[Image.Image]: List of PIL Images representing video frames
+            Union[List[Image.Image], FrameBuffer]: Video frames as PIL Images, or a
+                (frames, height, width, 3) uint8 FrameBuffer for output_type="array"
 
         Raises:
             Exception: If there's an error during video generation
         """
+        if output_type not in ("pil", "array"):
+            raise ValueError(f"Unsupported output type: {output_type}")
+
+        key = self._video_key(
+            seed,
+            prompt=prompt,
+            negative_prompt=negative_prompt,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+            num_frames=num_frames,
+            scheduler=scheduler,
+        )
+        cached = self._frames_from_cache(key, output_type, shared_memory)
+        if cached is not None:
+            return cached
+
         try:
             self._load_model()
             
             # Generate the video frames
-            result = self.pipe(
+            result = self._run_pipe(
+                scheduler=scheduler,
+                cancel_token=cancel_token,
                 prompt=prompt,
                 negative_prompt=negative_prompt,
                 num_inference_steps=num_inference_steps,
                 guidance_scale=guidance_scale,
                 num_frames=num_frames,
+                generator=_torch_generator(seed) if seed is not None else None,
+                # Tensor output skips the per-frame PIL images and the float32 copy on the host
+                output_type="pil" if output_type == "pil" else "pt",
             )
             
-            frames = result.frames[0]
+            if output_type == "pil":
+                frames = result.frames[0]
+            else:
+                frames = self._to_frame_buffer(result.frames[0], shared_memory)
+            del result
             self._cleanup()  # Clean up GPU memory
+            self._store_frames(key, frames)
             return frames
             
+        except GenerationCancelled:
+            self._cleanup()
+            raise
+
         except Exception as e:
             self._cleanup()  # Clean up GPU memory even on error
             raise Exception(f"Failed to generate video: {str(e)}")
 
-    def save_as_gif(self, frames: List[Image.Image], output_path: str, fps: int = 8) -> bool:
+    def generate_video_encoded(
+        self,
+        prompt: str,
+        negative_prompt: Optional[str] = None,
+        num_inference_steps: int = 50,
+        guidance_scale: float = 7.5,
+        num_frames: int = 16,
+        scheduler: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        container: Optional[str] = None,
+        fps: Optional[int] = None,
+        seed: Optional[int] = None,
+    ) -> bytes:
+        """
+        Generate a video and encode it to MP4 or WebM in memory.
+
+        Decoded frames are handed to a background encoder as soon as the pipeline
+        returns them. The pipeline decodes the whole clip before returning, so
+        encoding overlaps only with GPU cleanup, not with VAE decoding; the
+        causal VAE needs temporal context, so its latents are not decoded in
+        independent slices. ``generate_long_video`` does overlap decoding and
+        encoding, one chunk at a time.
+
+        Args:
+            prompt (str): The text prompt to generate the video from
+            negative_prompt (str, optional): Things to avoid in the video
+            num_inference_steps (int): Number of denoising steps (default: 50)
+            guidance_scale (float): How closely to follow the prompt (default: 7.5)
+            num_frames (int): Number of frames to generate (default: 16)
+            scheduler (str, optional): Entry of Config.SCHEDULERS to sample with (default: the generator's)
+            cancel_token (CancellationToken, optional): Stops the run at the next step once cancelled
+            container (str, optional): Entry of Config.VIDEO_FORMATS (default: Config.VIDEO_ENCODING_SETTINGS["container"])
+            fps (int, optional): Frames per second (default: Config.VIDEO_ENCODING_SETTINGS["fps"])
+            seed (int, optional): Makes the result reproducible and lets it be served from the artifact cache
+
+        Returns:
+            bytes: The encoded video
+
+        Raises:
+            Exception: If there's an error during video generation or encoding
+        """
+        container = container or Config.VIDEO_ENCODING_SETTINGS["container"]
+        fps = fps or Config.VIDEO_ENCODING_SETTINGS["fps"]
+        key = self._video_key(
+            seed,
+            prompt=prompt,
+            negative_prompt=negative_prompt,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+            num_frames=num_frames,
+            scheduler=scheduler,
+            container=container,
+            fps=fps,
+        )
+        cached = self._cached_video(key)
+        if cached is not None:
+            return cached
+
+        encoder = VideoEncoder(container, fps)
+        try:
+            self._load_model()
+
+            result = self._run_pipe(
+                scheduler=scheduler,
+                cancel_token=cancel_token,
+                prompt=prompt,
+                negative_prompt=negative_prompt,
+                num_inference_steps=num_inference_steps,
+                guidance_scale=guidance_scale,
+                num_frames=num_frames,
+                generator=_torch_generator(seed) if seed is not None else None,
+                output_type="pt",
+            )
+
+            frames = self._to_frame_buffer(result.frames[0], shared_memory=False)
+            del result
+            # Frames are views into the buffer, so the encoder reads them without copying
+            for frame in frames:
+                encoder.write(frame)
+            self._cleanup()
+            video = encoder.finish()
+            if key:
+                self.cache.set(key, video, container)
+            return video
+
+        except GenerationCancelled:
+            encoder.close()
+            self._cleanup()
+            raise
+
+        except Exception as e:
+            encoder.close()
+            self._cleanup()
+            raise Exception(f"Failed to generate video: {str(e)}")
+
+    @contextmanager
+    def _vae_tiling(self):
+        """
+        Decode in spatial tiles inside the block, then restore the shared pipeline's setting.
+
+        Tiling is a flag on the registry-resident VAE, so the block holds the
+        pipeline lock: other generations on this pipeline wait instead of
+        decoding with, or switching off, this block's tiling.
+        """
+        with pipeline_lock(self.pipe):
+            vae = getattr(self.pipe, "vae", None)
+            if not hasattr(vae, "enable_tiling"):
+                yield
+                return
+            was_tiling = getattr(vae, "use_tiling", False)
+            vae.enable_tiling()
+            try:
+                yield
+            finally:
+                if not was_tiling:
+                    vae.disable_tiling()
+
+    def _chunk_latents(
+        self,
+        num_frames: int,
+        seed: Optional[int],
+        shared: Optional[torch.Tensor],
+    ) -> torch.Tensor:
+        """Initial noise for one chunk, starting with the noise of the previous chunk's overlap"""
+        pipe = self.pipe
+        shape = (
+            1,
+            pipe.transformer.config.in_channels,
+            (num_frames - 1) // pipe.vae_temporal_scale_factor + 1,
+            pipe.default_height // pipe.vae_spatial_scale_factor,
+            pipe.default_width // pipe.vae_spatial_scale_factor,
+        )
+        generator = torch.Generator("cpu").manual_seed(seed) if seed is not None else None
+        latents = torch.randn(shape, generator=generator, dtype=torch.float32)
+        if shared is not None:
+            # Overlapping frames start from the same noise in both chunks. Each chunk is still
+            # denoised independently, so this only reduces drift; the crossfade hides the seam
+            latents[:, :, :shared.shape[2]] = shared
+        return latents
+
+    def generate_long_video(
+        self,
+        prompt: str,
+        negative_prompt: Optional[str] = None,
+        num_inference_steps: int = 50,
+        guidance_scale: float = 7.5,
+        num_frames: int = 97,
+        scheduler: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        container: Optional[str] = None,
+        fps: Optional[int] = None,
+        seed: Optional[int] = None,
+    ) -> bytes:
+        """
+        Generate a video of any length as overlapping temporal chunks and encode it.
+
+        Each chunk of ``Config.LONG_VIDEO_SETTINGS["chunk_frames"]`` frames is
+        denoised and decoded on its own with VAE tiling, blended into the
+        previous chunk over the overlap and streamed to the encoder before the
+        next chunk starts, so peak memory does not depend on ``num_frames``.
+        Chunks share only the initial noise of their overlap, not its denoised
+        content, so motion can change across a seam; the crossfade smooths it.
+
+        Args:
+            prompt (str): The text prompt to generate the video from
+            negative_prompt (str, optional): Things to avoid in the video
+            num_inference_steps (int): Number of denoising steps per chunk (default: 50)
+            guidance_scale (float): How closely to follow the prompt (default: 7.5)
+            num_frames (int): Total number of frames (default: 97)
+            scheduler (str, optional): Entry of Config.SCHEDULERS to sample with (default: the generator's)
+            cancel_token (CancellationToken, optional): Stops the run at the next step once cancelled
+            container (str, optional): Entry of Config.VIDEO_FORMATS (default: Config.VIDEO_ENCODING_SETTINGS["container"])
+            fps (int, optional): Frames per second (default: Config.VIDEO_ENCODING_SETTINGS["fps"])
+            seed (int, optional): Makes the result reproducible and lets it be served from the artifact cache
+
+        Returns:
+            bytes: The encoded video
+
+        Raises:
+            Exception: If there's an error during video generation or encoding
+        """
+        settings = Config.LONG_VIDEO_SETTINGS
+        chunk_frames = settings["chunk_frames"]
+        overlap = settings["overlap_frames"]
+        container = container or Config.VIDEO_ENCODING_SETTINGS["container"]
+        fps = fps or Config.VIDEO_ENCODING_SETTINGS["fps"]
+        key = self._video_key(
+            seed,
+            prompt=prompt,
+            negative_prompt=negative_prompt,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+            num_frames=num_frames,
+            scheduler=scheduler,
+            container=container,
+            fps=fps,
+            chunk_frames=chunk_frames,
+            overlap_frames=overlap,
+        )
+        cached = self._cached_video(key)
+        if cached is not None:
+            return cached
+
+        encoder = VideoEncoder(container, fps)
+        try:
+            self._load_model()
+            # Holds the shared pipeline for the whole run, so short videos queue behind it
+            with self._vae_tiling():
+                factor = self.pipe.vae_temporal_scale_factor
+                if (chunk_frames - 1) % factor or (overlap - 1) % factor or not 0 < overlap < chunk_frames:
+                    raise ValueError(
+                        f"chunk_frames and overlap_frames must be {factor}k + 1 with overlap_frames < chunk_frames"
+                    )
+                stride = chunk_frames - overlap
+                num_chunks = max(1, math.ceil((num_frames - overlap) / stride))
+                shared_latent_frames = (overlap - 1) // factor + 1
+
+                written = 0
+                tail = None
+                shared = None
+                for index in range(num_chunks):
+                    latents = self._chunk_latents(chunk_frames, seed + index if seed is not None else None, shared)
+                    shared = latents[:, :, -shared_latent_frames:].clone()
+
+                    result = self._run_pipe(
+                        scheduler=scheduler,
+                        cancel_token=cancel_token,
+                        prompt=prompt,
+                        negative_prompt=negative_prompt,
+                        num_inference_steps=num_inference_steps,
+                        guidance_scale=guidance_scale,
+                        num_frames=chunk_frames,
+                        latents=latents,
+                        output_type="pt",
+                    )
+                    frames = self._to_frame_buffer(result.frames[0], shared_memory=False).array
+                    del result, latents
+                    self._cleanup()
+
+                    if tail is not None:
+                        frames[:overlap] = _crossfade(tail, frames[:overlap])
+                    # The overlap is held back to be blended with the next chunk
+                    last = index == num_chunks - 1
+                    emit = frames if last else frames[:-overlap]
+                    for frame in emit[:num_frames - written]:
+                        encoder.write(frame)
+                    written += min(len(emit), num_frames - written)
+                    tail = None if last else frames[-overlap:].astype(np.float32)
+
+            video = encoder.finish()
+            if key:
+                self.cache.set(key, video, container)
+            return video
+
+        except GenerationCancelled:
+            encoder.close()
+            self._cleanup()
+            raise
+
+        except Exception as e:
+            encoder.close()
+            self._cleanup()
+            raise Exception(f"Failed to generate video: {str(e)}")
+
+    def benchmark(self, profile: str, num_inference_steps: int = 4) -> StepTimer:
+        """
+        Run a short, low-resolution generation under ``profile`` and return its step timings.
+
+        Pass this to ``src.utils.performance.benchmark_profiles`` to compare profiles on a host.
+        """
+        generator = MochiGenerator(profile)
+        try:
+            generator._load_model()
+            generator._run_pipe(
+                prompt="benchmark",
+                num_inference_steps=num_inference_steps,
+                height=256,
+                width=256,
+                num_frames=7,
+            )
+            return generator.last_step_timer
+        finally:
+            generator._cleanup()
+
+    def save_as_gif(self, frames: Union[List[Image.Image], FrameBuffer], output_path: str, fps: int = 8) -> bool:
         """
         Save video frames as a GIF file.
 
         Args:
-            frames (List[Image.Image]): List of PIL Image frames
+            frames (Union[List[Image.Image], FrameBuffer]): PIL Image frames or a FrameBuffer
             output_path (str): Path to save the GIF file
             fps (int): Frames per second for the GIF
 
@@ -84,7 +582,7 @@ class MochiGenerator:
             bool: True if successful, False otherwise
         """
         try:
-            imageio.mimsave(output_path, frames, fps=fps)
+            imageio.mimsave(output_path, frames.array if isinstance(frames, FrameBuffer) else frames, fps=fps)
             return True
         except Exception as e:
             raise Exception(f"Failed to save GIF: {str(e)}")
@@ -93,7 +591,6 @@ class MochiGenerator:
 if __name__ == "__main__":
     generator = MochiGenerator()
     prompt = "Astronaut in a jungle, cold color palette, muted colors, detailed, 8k"
-    frames = generator.generate_video(prompt)
-    generator.save_as_gif(frames, "mochi_generated.gif")
-    # Save first frame as preview
-    frames[0].save("mochi_preview.png")
+    video = generator.generate_video_encoded(prompt)
+    with open("mochi_generated.mp4", "wb") as f:
+        f.write(video)
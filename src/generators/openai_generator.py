@@ -1,12 +1,162 @@
-from openai import OpenAI
-from typing import Dict, List, Optional
+from openai import OpenAI, AsyncOpenAI
+from typing import Dict, Iterator, List, Optional, Tuple
+import asyncio
 import json
 from src.utils.config import Config
+from src.utils.llm_cache import LLMCache, get_llm_cache
+from src.utils.scheduler import get_scheduler
 
 class ContentGenerator:
-    def __init__(self):
-        self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        use_cache: bool = True,
+        bypass_cache: bool = False
+    ):
+        # Retries are handled by the shared scheduler, which honours Retry-After
+        self.client = OpenAI(api_key=Config.OPENAI_API_KEY, max_retries=0)
+        self.scheduler = get_scheduler()
         self.model = "gpt-4o-mini"  # Using GPT-4 Turbo
+        self.max_concurrency = max_concurrency or Config.CONTENT_SETTINGS["max_concurrency"]
+        # Responses are cached on disk; bypass_cache forces fresh output but still refreshes the cache
+        self.cache = get_llm_cache() if use_cache and Config.LLM_CACHE_SETTINGS["enabled"] else None
+        self.bypass_cache = bypass_cache
+
+    def _section_messages(self, heading: str) -> List[Dict[str, str]]:
+        main_prompt = f"""Write a detailed, informative paragraph about "{heading}".
+            The content should be engaging, factual, and around 150 words.
+            Focus on providing valuable insights and clear explanations."""
+
+        return [
+            {"role": "system", "content": "You are an expert content writer who creates clear, engaging, and informative content."},
+            {"role": "user", "content": main_prompt}
+        ]
+
+    def _subheading_messages(self, heading: str, subheading: str) -> List[Dict[str, str]]:
+        sub_prompt = f"""Write a concise but detailed paragraph about "{subheading}"
+                in the context of {heading}. The content should be around 100 words,
+                specific, and informative."""
+
+        return [
+            {"role": "system", "content": "You are an expert content writer who creates clear, engaging, and informative content."},
+            {"role": "user", "content": sub_prompt}
+        ]
+
+    def _batched_section_messages(self, heading: str, subheadings: List[str]) -> List[Dict[str, str]]:
+        keys = json.dumps(["main"] + list(subheadings))
+        batch_prompt = f"""Write the content of the document section "{heading}".
+            The response must be a valid JSON object whose keys are exactly {keys}.
+            The value of "main" is a detailed, informative paragraph of around 150 words about "{heading}".
+            Every other value is a concise but detailed paragraph of around 100 words about that
+            subheading in the context of {heading}, specific and informative.
+            Only return the JSON, no additional text."""
+
+        return [
+            {"role": "system", "content": "You are an expert content writer who creates clear, engaging, and informative content."},
+            {"role": "user", "content": batch_prompt}
+        ]
+
+    def _batched_document_messages(self, sections: List[Dict]) -> List[Dict[str, str]]:
+        outline = json.dumps(
+            {section["heading"]: ["main"] + list(section["subheadings"]) for section in sections},
+            indent=2
+        )
+        batch_prompt = f"""Write the content of a document with the following outline,
+            given as each section heading mapped to the keys it needs:
+            {outline}
+            The response must be a valid JSON object mapping every section heading to an object
+            with exactly those keys. The value of "main" is a detailed, informative paragraph of
+            around 150 words about the section heading. Every other value is a concise but detailed
+            paragraph of around 100 words about that subheading in the context of its section.
+            Only return the JSON, no additional text."""
+
+        return [
+            {"role": "system", "content": "You are an expert content writer who creates clear, engaging, and informative content."},
+            {"role": "user", "content": batch_prompt}
+        ]
+
+    def _params(self, json_mode: bool) -> Dict:
+        params = {"temperature": 0.7}
+        if json_mode:
+            params["response_format"] = {"type": "json_object"}
+        return params
+
+    def _cached(self, key: str) -> Optional[str]:
+        if self.cache is None or self.bypass_cache:
+            return None
+        return self.cache.get(key)
+
+    def _store(self, key: str, value: str):
+        if self.cache is not None:
+            self.cache.set(key, value)
+
+    def _complete(self, messages: List[Dict[str, str]], json_mode: bool = False) -> str:
+        params = self._params(json_mode)
+        key = LLMCache.make_key(self.model, messages, params)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        response = self.scheduler.submit(
+            "openai",
+            self.client.chat.completions.create,
+            model=self.model,
+            messages=messages,
+            **params
+        )
+        content = response.choices[0].message.content.strip()
+        self._store(key, content)
+        return content
+
+    def _stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        key = LLMCache.make_key(self.model, messages, self._params(False))
+        cached = self._cached(key)
+        if cached is not None:
+            yield cached
+            return
+
+        stream = self.scheduler.submit(
+            "openai",
+            self.client.chat.completions.create,
+            model=self.model,
+            messages=messages,
+            stream=True,
+            **self._params(False)
+        )
+        parts = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+        self._store(key, "".join(parts).strip())
+
+    async def _acomplete(
+        self,
+        client: AsyncOpenAI,
+        semaphore: asyncio.Semaphore,
+        messages: List[Dict[str, str]],
+        json_mode: bool = False
+    ) -> str:
+        params = self._params(json_mode)
+        key = LLMCache.make_key(self.model, messages, params)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        async with semaphore:
+            response = await self.scheduler.asubmit(
+                "openai",
+                client.chat.completions.create,
+                model=self.model,
+                messages=messages,
+                **params
+            )
+        content = response.choices[0].message.content.strip()
+        self._store(key, content)
+        return content
 
     def generate_content_structure(self, topic: str) -> Optional[Dict]:
         try:
@@ -25,17 +175,15 @@ class ContentGenerator:
             Make it comprehensive but concise with 3-4 sections and 2-3 subheadings each.
             Only return the JSON, no additional text."""
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            response = self._complete(
+                [
                     {"role": "system", "content": "You are a document structure expert. You create well-organized, logical document outlines."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.7,
-                response_format={"type": "json_object"}
+                json_mode=True
             )
 
-            return json.loads(response.choices[0].message.content)
+            return json.loads(response)
 
         except Exception as e:
             print(f"Error generating structure: {str(e)}")
@@ -44,42 +192,213 @@ class ContentGenerator:
     def generate_section_content(self, heading: str, subheadings: List[str]) -> Optional[Dict[str, str]]:
         try:
             content = {}
-            
-            # Generate main heading content
-            main_prompt = f"""Write a detailed, informative paragraph about "{heading}".
-            The content should be engaging, factual, and around 150 words.
-            Focus on providing valuable insights and clear explanations."""
 
-            main_response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert content writer who creates clear, engaging, and informative content."},
-                    {"role": "user", "content": main_prompt}
-                ],
-                temperature=0.7
-            )
-            
-            content["main"] = main_response.choices[0].message.content.strip()
+            # Generate main heading content
+            content["main"] = self._complete(self._section_messages(heading))
 
             # Generate content for each subheading
             for subheading in subheadings:
-                sub_prompt = f"""Write a concise but detailed paragraph about "{subheading}" 
-                in the context of {heading}. The content should be around 100 words,
-                specific, and informative."""
-
-                sub_response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are an expert content writer who creates clear, engaging, and informative content."},
-                        {"role": "user", "content": sub_prompt}
-                    ],
-                    temperature=0.7
-                )
-                
-                content[subheading] = sub_response.choices[0].message.content.strip()
+                content[subheading] = self._complete(self._subheading_messages(heading, subheading))
 
             return content
 
         except Exception as e:
             print(f"Error generating content: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+
+    def stream_section_content(self, heading: str, subheadings: List[str]) -> Iterator[Tuple[str, str]]:
+        """
+        Stream the content of a section as it is generated.
+
+        Args:
+            heading (str): Section heading
+            subheadings (List[str]): Subheadings of the section
+
+        Yields:
+            Tuple[str, str]: ("main" or subheading, text chunk), in section order
+
+        Raises:
+            Exception: If a request fails mid-section, so a truncated section is never mistaken for a whole one
+        """
+        try:
+            for chunk in self._stream(self._section_messages(heading)):
+                yield "main", chunk
+
+            for subheading in subheadings:
+                for chunk in self._stream(self._subheading_messages(heading, subheading)):
+                    yield subheading, chunk
+
+        except Exception as e:
+            print(f"Error streaming content: {str(e)}")
+            raise
+
+    def generate_section_content_batched(self, heading: str, subheadings: List[str]) -> Optional[Dict[str, str]]:
+        """
+        Generate a whole section in a single JSON-mode request.
+
+        Keys missing from the response (or returned empty) are filled in with
+        individual requests, so the result always matches ``generate_section_content``.
+
+        Args:
+            heading (str): Section heading
+            subheadings (List[str]): Subheadings of the section
+
+        Returns:
+            Optional[Dict[str, str]]: Content keyed by "main" and each subheading,
+            or None if generation fails
+        """
+        try:
+            try:
+                batch = json.loads(self._complete(
+                    self._batched_section_messages(heading, subheadings),
+                    json_mode=True
+                ))
+            except Exception as e:
+                print(f"Error generating batched content for {heading}: {str(e)}")
+                batch = {}
+
+            return self._fill_missing(heading, subheadings, batch if isinstance(batch, dict) else {})
+
+        except Exception as e:
+            print(f"Error generating content: {str(e)}")
+            return None
+
+    def generate_document_content_batched(self, sections: List[Dict]) -> Dict[str, Dict[str, str]]:
+        """
+        Generate every section of the document in a single JSON-mode request.
+
+        The response is validated per heading and per key; only the missing
+        parts fall back to individual requests. Sections that still fail are
+        left out, as with ``generate_section_content`` returning None.
+
+        Args:
+            sections (List[Dict]): Sections from ``generate_content_structure``
+
+        Returns:
+            Dict[str, Dict[str, str]]: Content keyed by heading, then by "main"/subheading
+        """
+        try:
+            batch = json.loads(self._complete(
+                self._batched_document_messages(sections),
+                json_mode=True
+            ))
+        except Exception as e:
+            print(f"Error generating batched document: {str(e)}")
+            batch = {}
+
+        contents = {}
+        for section in sections:
+            heading = section["heading"]
+            section_batch = batch.get(heading) if isinstance(batch, dict) else None
+            try:
+                contents[heading] = self._fill_missing(
+                    heading,
+                    section["subheadings"],
+                    section_batch if isinstance(section_batch, dict) else {}
+                )
+            except Exception as e:
+                print(f"Error generating content: {str(e)}")
+
+        return contents
+
+    def _fill_missing(self, heading: str, subheadings: List[str], batch: Dict) -> Dict[str, str]:
+        """Keep the valid keys of a batched response and request the rest individually."""
+        content = {}
+        for key in ["main"] + list(subheadings):
+            value = batch.get(key)
+            if isinstance(value, str) and value.strip():
+                content[key] = value.strip()
+            elif key == "main":
+                content[key] = self._complete(self._section_messages(heading))
+            else:
+                content[key] = self._complete(self._subheading_messages(heading, key))
+        return content
+
+    async def agenerate_document_content(
+        self,
+        sections: List[Dict],
+        client: Optional[AsyncOpenAI] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        Generate the content of every section and subheading concurrently.
+
+        All requests are fanned out at once and bounded by ``max_concurrency``,
+        so the wall-clock time approaches that of the slowest single call.
+        Results are reassembled in outline order. Sections with a failed
+        request are left out, matching ``generate_section_content`` returning None.
+
+        Args:
+            sections (List[Dict]): Sections from ``generate_content_structure``
+            client (AsyncOpenAI, optional): Client to send the requests with; one is opened and closed if omitted
+            semaphore (asyncio.Semaphore, optional): Limit on requests in flight, shared when several
+                documents are generated at once (default: a new one of ``max_concurrency``)
+
+        Returns:
+            Dict[str, Dict[str, str]]: Content keyed by heading, then by "main"/subheading
+        """
+        if client is None:
+            async with AsyncOpenAI(api_key=Config.OPENAI_API_KEY, max_retries=0) as client:
+                return await self.agenerate_document_content(sections, client, semaphore)
+        semaphore = semaphore or asyncio.Semaphore(self.max_concurrency)
+
+        # One (heading, key) slot per request, in outline order
+        slots = []
+        requests = []
+        for section in sections:
+            heading = section["heading"]
+            slots.append((heading, "main"))
+            requests.append(self._acomplete(client, semaphore, self._section_messages(heading)))
+            for subheading in section["subheadings"]:
+                slots.append((heading, subheading))
+                requests.append(self._acomplete(
+                    client, semaphore, self._subheading_messages(heading, subheading)
+                ))
+
+        results = await asyncio.gather(*requests, return_exceptions=True)
+
+        contents = {}
+        failed = set()
+        for (heading, key), result in zip(slots, results):
+            if isinstance(result, Exception):
+                print(f"Error generating content: {str(result)}")
+                failed.add(heading)
+                continue
+            contents.setdefault(heading, {})[key] = result
+
+        return {heading: content for heading, content in contents.items() if heading not in failed}
+
+    def generate_document_content(self, sections: List[Dict], strategy: Optional[str] = None) -> Dict[str, Dict[str, str]]:
+        """
+        Generate the content of every section using the given strategy.
+
+        Args:
+            sections (List[Dict]): Sections from ``generate_content_structure``
+            strategy (str, optional): "concurrent" (one request per item, fanned out),
+                "batched_section" (one JSON request per section) or
+                "batched_document" (one JSON request for the whole document).
+                Defaults to ``Config.CONTENT_SETTINGS["strategy"]``.
+
+        Returns:
+            Dict[str, Dict[str, str]]: Content keyed by heading, then by "main"/subheading
+        """
+        strategy = strategy or Config.CONTENT_SETTINGS["strategy"]
+
+        if strategy == "batched_document":
+            return self.generate_document_content_batched(sections)
+
+        if strategy == "batched_section":
+            contents = {}
+            for section in sections:
+                section_content = self.generate_section_content_batched(
+                    section["heading"],
+                    section["subheadings"]
+                )
+                if section_content:
+                    contents[section["heading"]] = section_content
+            return contents
+
+        if strategy == "concurrent":
+            return asyncio.run(self.agenerate_document_content(sections))
+
+        raise ValueError(f"Unknown content strategy: {strategy}")
@@ -1,102 +1,255 @@
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import BaseDocTemplate, Paragraph, Spacer, Frame, PageTemplate
 from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER
-from typing import Dict, List
-import os
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+import io
+import threading
+from src.utils.config import Config
+
+# Built once per process and shared by every PDFGenerator; styles are read-only after setup
+_shared_styles: Optional[StyleSheet1] = None
+_registered_fonts = set()
+_setup_lock = threading.Lock()
+
+def register_fonts(fonts: Dict[str, str]):
+    """Register TrueType fonts (name -> .ttf path) with reportlab, skipping ones already registered."""
+    with _setup_lock:
+        for name, path in fonts.items():
+            if name not in _registered_fonts:
+                pdfmetrics.registerFont(TTFont(name, path))
+                _registered_fonts.add(name)
+
+def _build_styles() -> StyleSheet1:
+    styles = getSampleStyleSheet()
+    font = Config.PDF_SETTINGS["font_name"]
+    font_args = {"fontName": font} if font else {}
+
+    # Title style
+    styles.add(ParagraphStyle(
+        name='CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        **font_args
+    ))
+
+    # Heading style
+    styles.add(ParagraphStyle(
+        name='CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=16,
+        spaceAfter=20,
+        spaceBefore=30,
+        **font_args
+    ))
+
+    # Subheading style
+    styles.add(ParagraphStyle(
+        name='CustomSubHeading',
+        parent=styles['Heading3'],
+        fontSize=14,
+        spaceAfter=15,
+        spaceBefore=20,
+        **font_args
+    ))
+
+    # Content style
+    styles.add(ParagraphStyle(
+        name='CustomBody',
+        parent=styles['Normal'],
+        fontSize=12,
+        alignment=TA_JUSTIFY,
+        spaceAfter=12,
+        **font_args
+    ))
+
+    return styles
+
+def get_shared_styles() -> StyleSheet1:
+    """Return the process-wide stylesheet, registering configured fonts on first use."""
+    global _shared_styles
+    if _shared_styles is None:
+        register_fonts(Config.PDF_SETTINGS["fonts"])
+        with _setup_lock:
+            if _shared_styles is None:
+                _shared_styles = _build_styles()
+    return _shared_styles
+
+def _frame_geometry(pagesize: Tuple[float, float], margin: float) -> Tuple[float, float, float, float]:
+    """Frame position and size for a page size and uniform margin."""
+    width, height = pagesize
+    return margin, margin, width - 2 * margin, height - 2 * margin
 
 class PDFGenerator:
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._setup_styles()
-
-    def _setup_styles(self):
-        # Title style
-        self.styles.add(ParagraphStyle(
-            name='CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=TA_CENTER
-        ))
-
-        # Heading style
-        self.styles.add(ParagraphStyle(
-            name='CustomHeading',
-            parent=self.styles['Heading2'],
-            fontSize=16,
-            spaceAfter=20,
-            spaceBefore=30
-        ))
-
-        # Subheading style
-        self.styles.add(ParagraphStyle(
-            name='CustomSubHeading',
-            parent=self.styles['Heading3'],
-            fontSize=14,
-            spaceAfter=15,
-            spaceBefore=20
-        ))
-
-        # Content style
-        self.styles.add(ParagraphStyle(
-            name='CustomBody',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            alignment=TA_JUSTIFY,
-            spaceAfter=12
-        ))
+        self.styles = get_shared_styles()
+        # Resolved once so story building does no stylesheet lookups per paragraph
+        self._title_style = self.styles['CustomTitle']
+        self._heading_style = self.styles['CustomHeading']
+        self._subheading_style = self.styles['CustomSubHeading']
+        self._body_style = self.styles['CustomBody']
+
+    def _title_story(self, title: str) -> List:
+        return [
+            Paragraph(title, self._title_style),
+            Spacer(1, 30)
+        ]
+
+    def _section_story(self, section: Dict, section_contents: Optional[Dict[str, str]]) -> List:
+        section_contents = section_contents or {}
+        body_style = self._body_style
+        subheading_style = self._subheading_style
+        story = []
+        append = story.append
+
+        # Add main heading
+        append(Paragraph(section['heading'], self._heading_style))
+
+        # Add main heading content
+        main = section_contents.get('main')
+        if main is not None:
+            append(Paragraph(main, body_style))
+
+        # Add subheadings and their content
+        for subheading in section['subheadings']:
+            append(Paragraph(subheading, subheading_style))
+            text = section_contents.get(subheading)
+            if text is not None:
+                append(Paragraph(text, body_style))
+
+        return story
+
+    def _new_doc(self, target: Union[str, BinaryIO]) -> BaseDocTemplate:
+        # Frames keep per-build layout state, so templates are cheap fresh objects over cached geometry
+        x, y, width, height = _frame_geometry(A4, 72)
+        frame = Frame(x, y, width, height, id='normal')
+        return BaseDocTemplate(
+            target,
+            pagesize=A4,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=72,
+            pageTemplates=[
+                PageTemplate(id='First', frames=frame, pagesize=A4),
+                PageTemplate(id='Later', frames=frame, pagesize=A4)
+            ]
+        )
 
     def generate_pdf(
         self, 
         title: str, 
         sections: List[Dict], 
         contents: Dict[str, Dict[str, str]], 
-        output_path: str
-    ) -> str:
+        output: Union[str, BinaryIO, None] = None
+    ) -> Union[str, bytes, memoryview, None]:
+        """
+        Lay out and write the PDF.
+
+        Args:
+            title (str): Document title
+            sections (List[Dict]): Sections from the content structure
+            contents (Dict[str, Dict[str, str]]): Content keyed by heading, then by "main"/subheading
+            output (str or writable buffer, optional): File path or buffer to write to.
+                When omitted the PDF is rendered in memory.
+
+        Returns:
+            The path when writing to a file, a memoryview over the buffer when one is
+            given (bytes if it cannot expose one), the PDF bytes when no output is
+            given, or None if generation fails
+        """
         try:
-            doc = SimpleDocTemplate(
-                output_path,
-                pagesize=A4,
-                rightMargin=72,
-                leftMargin=72,
-                topMargin=72,
-                bottomMargin=72
-            )
+            buffer = io.BytesIO() if output is None else output
+            doc = self._new_doc(buffer)
 
             # Build the document
-            story = []
-
-            # Add title
-            story.append(Paragraph(title, self.styles['CustomTitle']))
-            story.append(Spacer(1, 30))
+            story = self._title_story(title)
 
             # Add sections
+            extend = story.extend
+            section_story = self._section_story
+            get_contents = contents.get
             for section in sections:
-                # Add main heading
-                story.append(Paragraph(section['heading'], self.styles['CustomHeading']))
-                
-                # Add main heading content
-                if section['heading'] in contents:
-                    story.append(Paragraph(
-                        contents[section['heading']]['main'], 
-                        self.styles['CustomBody']
-                    ))
-
-                # Add subheadings and their content
-                for subheading in section['subheadings']:
-                    story.append(Paragraph(subheading, self.styles['CustomSubHeading']))
-                    if section['heading'] in contents and subheading in contents[section['heading']]:
-                        story.append(Paragraph(
-                            contents[section['heading']][subheading], 
-                            self.styles['CustomBody']
-                        ))
+                extend(section_story(section, get_contents(section['heading'])))
 
             # Build the PDF
             doc.build(story)
-            return output_path
+            return _pdf_result(output, buffer)
+
+        except Exception as e:
+            print(f"Error generating PDF: {str(e)}")
+            return None
+
+    def start_pdf(self, title: str, output: Union[str, BinaryIO, None] = None) -> "IncrementalPDFBuilder":
+        """
+        Start a PDF that is laid out section by section as content arrives.
+
+        Args:
+            title (str): Document title
+            output (str or writable buffer, optional): Where the finished PDF is written;
+                rendered in memory when omitted
+
+        Returns:
+            IncrementalPDFBuilder: Builder to add sections to and finish
+        """
+        return IncrementalPDFBuilder(self, title, output)
+
+
+def _pdf_result(output: Union[str, BinaryIO, None], buffer: BinaryIO) -> Union[str, bytes, memoryview]:
+    """Return the path, a view of the caller's buffer, or the bytes of our own buffer."""
+    if isinstance(output, str):
+        return output
+    if output is None:
+        return buffer.getvalue()
+    if hasattr(buffer, "getbuffer"):
+        return buffer.getbuffer()
+    return buffer.getvalue()
+
+
+class IncrementalPDFBuilder:
+    """
+    Lays out a PDF incrementally.
+
+    Each completed section is flowed onto pages as soon as it is added, so
+    ``finish`` only has to close the last page and save the file instead of
+    laying out the whole document in one pass.
+    """
+
+    def __init__(self, pdf_generator: PDFGenerator, title: str, output: Union[str, BinaryIO, None] = None):
+        self.pdf_generator = pdf_generator
+        self.output = output
+        self.buffer = io.BytesIO() if output is None else output
+        self.doc = pdf_generator._new_doc(self.buffer)
+        self.doc._startBuild()
+        self.doc.canv._doctemplate = self.doc
+        self._finished = False
+
+        self._flow(self.pdf_generator._title_story(title))
+
+    def _flow(self, flowables: List):
+        while flowables:
+            self.doc.clean_hanging()
+            self.doc.handle_flowable(flowables)
+
+    def add_section(self, section: Dict, section_contents: Optional[Dict[str, str]]):
+        """Lay out a completed section onto the document's pages."""
+        if self._finished:
+            raise RuntimeError("Cannot add sections to a finished PDF")
+        self._flow(self.pdf_generator._section_story(section, section_contents))
+
+    def finish(self) -> Union[str, bytes, memoryview, None]:
+        """Close the last page and write the PDF; returns the same kinds of result as ``generate_pdf``."""
+        try:
+            del self.doc.canv._doctemplate
+            self.doc._endBuild()
+            self._finished = True
+            return _pdf_result(self.output, self.buffer)
 
         except Exception as e:
             print(f"Error generating PDF: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
@@ -1,10 +1,17 @@
 import requests
 from typing import Optional
 import time
+from src.utils.http_pool import HTTPPool, get_http_pool
+from src.utils.scheduler import get_scheduler
 
 class PollinationsGenerator:
-    def __init__(self):
+    def __init__(self, http_pool: Optional[HTTPPool] = None):
         self.base_url = "https://image.pollinations.ai/prompt"
+        self.scheduler = get_scheduler()
+        self.http = http_pool or get_http_pool()
+
+    def _head(self, url: str) -> requests.Response:
+        return self.http.head(url)
 
     def generate_image(self, prompt: str, model: str = "stable-diffusion-xl") -> Optional[str]:
         try:
@@ -14,8 +21,7 @@ class PollinationsGenerator:
             image_url = f"{self.base_url}/{encoded_prompt}"
             
             # Test if the URL is accessible
-            response = requests.head(image_url)
-            response.raise_for_status()
+            self.scheduler.submit("pollinations", self._head, image_url)
             
             return image_url
 
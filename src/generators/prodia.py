@@ -1,47 +1,246 @@
-import requests
-from typing import Optional
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import statistics
+import threading
 import time
+import httpx
+from src.utils.config import Config
+from src.utils.http_pool import HTTPPool, get_http_pool
+from src.utils.scheduler import get_scheduler, PRIORITY_LOW
+
+class ProdiaJobTracker:
+    """
+    Submits Prodia jobs and polls every in-flight job from one asyncio loop.
+
+    The loop runs on a single background thread, so any number of pending
+    generations costs one thread and one HTTP connection pool. Each job is
+    first polled around the time recent jobs have tended to finish, then with
+    a growing interval while it runs late; a job still pending after
+    ``deadline_seconds`` fails with a TimeoutError. Connection limits,
+    timeouts and compression follow ``http_pool``'s settings for the Prodia host.
+    """
+
+    def __init__(self, headers: Dict[str, str], base_url: str, http_pool: HTTPPool):
+        settings = Config.PRODIA_SETTINGS
+        self.headers = dict(http_pool.default_headers, **headers)
+        self.base_url = base_url
+        self.http = http_pool
+        self.deadline_seconds = settings["deadline_seconds"]
+        self.min_poll_seconds = settings["min_poll_seconds"]
+        self.max_poll_seconds = settings["max_poll_seconds"]
+        self.poll_backoff = settings["poll_backoff"]
+        self.scheduler = get_scheduler()
+        self._durations = deque(maxlen=settings["completion_window"])
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._stats = {"submitted": 0, "succeeded": 0, "failed": 0, "timed_out": 0, "polls": 0}
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        threading.Thread(target=self._run_loop, daemon=True).start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        connect_timeout, read_timeout = self.http.timeout
+        pool_size = self.http.pool_size(self.base_url)
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+        self._wakeup = asyncio.Event()
+        self._loop.create_task(self._poll_forever())
+        self._loop.call_soon(self._ready.set)
+        self._loop.run_forever()
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> Dict[str, Any]:
+        response = await self._client.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def _expected_seconds(self) -> float:
+        """How long jobs usually take: the fast quartile of recent completion times."""
+        if len(self._durations) >= 2:
+            return statistics.quantiles(self._durations, n=4)[0]
+        if self._durations:
+            return self._durations[0]
+        return Config.PRODIA_SETTINGS["initial_estimate_seconds"]
+
+    def _next_poll_delay(self, job: Dict[str, Any], now: float) -> float:
+        remaining = self._expected_seconds() - (now - job["submitted"])
+        if remaining > self.min_poll_seconds:
+            return remaining
+        # Running late: back off geometrically instead of hammering the API
+        delay = self.min_poll_seconds * self.poll_backoff ** job["late_polls"]
+        job["late_polls"] += 1
+        return min(self.max_poll_seconds, delay)
+
+    async def _track(self, payload: Dict[str, Any]) -> str:
+        job = await self.scheduler.asubmit("prodia", self._request, "POST", f"{self.base_url}/generate", json=payload)
+        now = time.monotonic()
+        state = {
+            "future": self._loop.create_future(),
+            "submitted": now,
+            "deadline": now + self.deadline_seconds,
+            "late_polls": 0,
+            "polling": False,
+        }
+        state["next_poll"] = now + self._next_poll_delay(state, now)
+        # A caller that gives up cancels the future; stop tracking the job then
+        state["future"].add_done_callback(lambda future, job_id=job["id"]: self._forget(job_id, future))
+        self._jobs[job["id"]] = state
+        self._stats["submitted"] += 1
+        self._wakeup.set()
+        return await state["future"]
+
+    def _forget(self, job_id: str, future: "asyncio.Future"):
+        if future.cancelled() and self._jobs.get(job_id, {}).get("future") is future:
+            del self._jobs[job_id]
+            self._wakeup.set()
+
+    def _finish(self, job_id: str, result: Optional[str] = None, error: Optional[Exception] = None):
+        state = self._jobs.pop(job_id, None)
+        if state is None or state["future"].done():
+            return
+        if error is None:
+            state["future"].set_result(result)
+        else:
+            state["future"].set_exception(error)
+
+    async def _poll(self, job_id: str):
+        state = self._jobs.get(job_id)
+        if state is None:
+            return
+        try:
+            data = await self.scheduler.asubmit(
+                "prodia", self._request, "GET", f"{self.base_url}/generation/{job_id}", priority=PRIORITY_LOW
+            )
+        except httpx.TransportError:
+            # Network hiccup: the job itself may be fine, so try again on the next poll
+            data = {"status": "pending"}
+        except Exception as e:
+            self._stats["failed"] += 1
+            self._finish(job_id, error=e)
+            return
+        finally:
+            state["polling"] = False
+            self._stats["polls"] += 1
+
+        if self._jobs.get(job_id) is not state:
+            return  # the caller gave up while this poll was in flight
+        now = time.monotonic()
+        status = data.get("status") if isinstance(data, dict) else None
+        url = (data.get("image") or {}).get("url") if status == "succeeded" else None
+        if status is None or (status == "succeeded" and not url):
+            # Fail fast: re-polling a malformed response would spin until the deadline
+            self._stats["failed"] += 1
+            self._finish(job_id, error=Exception(f"Unexpected Prodia response for job {job_id}: {data}"))
+        elif status == "succeeded":
+            self._durations.append(now - state["submitted"])
+            self._stats["succeeded"] += 1
+            self._finish(job_id, result=url)
+        elif status == "failed":
+            self._stats["failed"] += 1
+            self._finish(job_id, error=Exception("Image generation failed"))
+        else:
+            state["next_poll"] = min(now + self._next_poll_delay(state, now), state["deadline"])
+            self._wakeup.set()
+
+    async def _poll_forever(self):
+        """Poll every job that is due, then sleep until the next one is."""
+        while True:
+            now = time.monotonic()
+            for job_id, state in list(self._jobs.items()):
+                if state["polling"]:
+                    continue
+                if now >= state["deadline"]:
+                    self._stats["timed_out"] += 1
+                    self._finish(job_id, error=TimeoutError(
+                        f"Prodia job {job_id} did not finish within {self.deadline_seconds}s"
+                    ))
+                elif now >= state["next_poll"]:
+                    state["polling"] = True
+                    self._loop.create_task(self._poll(job_id))
+
+            waiting = [state["next_poll"] for state in self._jobs.values() if not state["polling"]]
+            timeout = max(0.0, min(waiting) - time.monotonic()) if waiting else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def submit(self, payload: Dict[str, Any]) -> "asyncio.Future":
+        """Start a job from any thread; returns a concurrent future for the image URL."""
+        return asyncio.run_coroutine_threadsafe(self._track(payload), self._loop)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return job counters, jobs in flight and the current completion estimate."""
+        return dict(
+            self._stats,
+            in_flight=len(self._jobs),
+            expected_seconds=self._expected_seconds(),
+        )
+
+_shared_trackers: Dict[Tuple[str, int], ProdiaJobTracker] = {}
+_shared_lock = threading.Lock()
+
+def get_job_tracker(api_key: str, base_url: str, headers: Dict[str, str], http_pool: HTTPPool) -> ProdiaJobTracker:
+    """Return the process-wide tracker for ``api_key`` and ``http_pool`` so their callers share one polling loop."""
+    # The tracker references the pool, so its id stays unique while the entry exists
+    key = (api_key, id(http_pool))
+    with _shared_lock:
+        if key not in _shared_trackers:
+            _shared_trackers[key] = ProdiaJobTracker(headers, base_url, http_pool)
+        return _shared_trackers[key]
 
 class ProdiaGenerator:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, http_pool: Optional[HTTPPool] = None):
         self.api_key = api_key
         self.base_url = "https://api.prodia.com/v1"
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self.http = http_pool or get_http_pool()
+        self.tracker = get_job_tracker(self.api_key, self.base_url, self.headers, self.http)
+
+    def _payload(self, prompt: str, model: str, steps: int) -> Dict[str, Any]:
+        return {
+            "prompt": prompt,
+            "model": model,
+            "steps": steps,
+            "cfg_scale": 7,
+            "negative_prompt": "blurry, bad quality, distorted",
+            "aspect_ratio": "square"
+        }
 
     def generate_image(self, prompt: str, model: str = "sdxl", steps: int = 30) -> Optional[str]:
         try:
-            # Create generation request
-            generate_url = f"{self.base_url}/generate"
-            payload = {
-                "prompt": prompt,
-                "model": model,
-                "steps": steps,
-                "cfg_scale": 7,
-                "negative_prompt": "blurry, bad quality, distorted",
-                "aspect_ratio": "square"
-            }
-            
-            response = requests.post(generate_url, headers=self.headers, json=payload)
-            response.raise_for_status()
-            job = response.json()
-            
-            # Poll for completion
-            while True:
-                status_url = f"{self.base_url}/generation/{job['id']}"
-                status_response = requests.get(status_url, headers=self.headers)
-                status_response.raise_for_status()
-                
-                status_data = status_response.json()
-                if status_data["status"] == "succeeded":
-                    return status_data["image"]["url"]
-                elif status_data["status"] == "failed":
-                    raise Exception("Image generation failed")
-                    
-                time.sleep(1)
+            # The tracker enforces the deadline, so this wait is bounded
+            return self.tracker.submit(self._payload(prompt, model, steps)).result()
 
         except Exception as e:
             print(f"Error generating image with Prodia: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+
+    async def agenerate_image(self, prompt: str, model: str = "sdxl", steps: int = 30) -> Optional[str]:
+        """Async variant of ``generate_image`` usable from any event loop."""
+        try:
+            return await asyncio.wrap_future(self.tracker.submit(self._payload(prompt, model, steps)))
+
+        except Exception as e:
+            print(f"Error generating image with Prodia: {str(e)}")
+            return None
+
+    def generate_images(self, prompts: List[str], model: str = "sdxl", steps: int = 30) -> List[Optional[str]]:
+        """Run many generations at once; results are in prompt order, None for failures."""
+        futures = [self.tracker.submit(self._payload(prompt, model, steps)) for prompt in prompts]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Error generating image with Prodia: {str(e)}")
+                results.append(None)
+        return results
@@ -1,11 +1,157 @@
 import requests
-from typing import Optional
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Union
+import io
+import tempfile
+import threading
 import time
 import base64
 import os
+from src.utils.config import Config
+from src.utils.http_pool import HTTPPool, get_http_pool
+from src.utils.scheduler import get_scheduler
+
+def _is_engine_error(error: Exception) -> bool:
+    """True if the API rejected the request because the engine is unknown or gone."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return False
+    return response.status_code == 404 or (response.status_code == 400 and "engine" in response.text.lower())
+
+def _decode_artifact(chunks: Iterable[bytes], out: BinaryIO, field: bytes = b'"base64"') -> int:
+    """
+    Base64-decode the first ``field`` string of a streamed JSON body into ``out``.
+
+    Only the key being searched for and fewer than four leftover base64
+    characters are held between chunks, so memory stays at one chunk however
+    large the artifact is.
+
+    Returns:
+        int: Number of decoded bytes written
+    """
+    head = b""  # body seen so far while looking for the key
+    pending = b""  # base64 characters not yet forming a full 4-character group
+    in_value = False
+    written = 0
+    for chunk in chunks:
+        if not in_value:
+            head += chunk
+            index = head.find(field)
+            if index < 0:
+                head = head[-len(field):]
+                continue
+            rest = head[index + len(field):]
+            quote = rest.find(b'"')
+            if quote < 0:
+                head = head[index:]
+                continue
+            if rest[:quote].strip(b" \t\r\n:"):
+                raise Exception(f"Unexpected value for {field.decode()} in Stability AI response")
+            chunk = rest[quote + 1:]
+            in_value = True
+            head = b""
+
+        end = chunk.find(b'"')
+        # Base64 has no backslashes; JSON encoders may still escape "/" as "\/"
+        data = pending + (chunk if end < 0 else chunk[:end]).replace(b"\\", b"")
+        usable = len(data) - len(data) % 4
+        written += out.write(base64.b64decode(data[:usable]))
+        pending = data[usable:]
+        if end >= 0:
+            if pending:
+                written += out.write(base64.b64decode(pending + b"=" * (-len(pending) % 4)))
+            return written
+    raise Exception("No video artifact in Stability AI response")
+
+class EngineCatalog:
+    """
+    TTL cache of the Stability engine list, shared by every generator using the same key.
+
+    A catalog older than ``engine_refresh_after_seconds`` is still served while
+    a background thread fetches a fresh one; only a catalog older than
+    ``engine_ttl_seconds`` (or none at all) makes the caller wait for
+    ``/engines/list``. An engine pinned in ``Config.STABILITY_SETTINGS`` skips
+    discovery entirely.
+    """
+
+    def __init__(self, fetch: Callable[[], List[Dict[str, Any]]]):
+        settings = Config.STABILITY_SETTINGS
+        self.ttl_seconds = settings["engine_ttl_seconds"]
+        self.refresh_after_seconds = settings["engine_refresh_after_seconds"]
+        self._fetch = fetch
+        self._engines: Optional[List[Dict[str, Any]]] = None
+        self._fetched_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "background_refreshes": 0, "invalidations": 0}
+
+    @property
+    def pinned(self) -> Optional[str]:
+        return Config.STABILITY_SETTINGS["engine"]
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        """Fetch the engine list now and cache it."""
+        engines = self._fetch()
+        with self._lock:
+            self._engines = engines
+            self._fetched_at = time.monotonic()
+        return engines
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Error refreshing Stability AI engines: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def engines(self) -> List[Dict[str, Any]]:
+        """Return the cached engine list, fetching it first if it has expired."""
+        with self._lock:
+            age = time.monotonic() - self._fetched_at
+            if self._engines is not None and age < self.ttl_seconds:
+                self._stats["hits"] += 1
+                if age >= self.refresh_after_seconds and not self._refreshing:
+                    self._refreshing = True
+                    self._stats["background_refreshes"] += 1
+                    threading.Thread(target=self._refresh_in_background, daemon=True).start()
+                return self._engines
+            self._stats["misses"] += 1
+        return self.refresh()
+
+    def video_engine(self) -> str:
+        """Return the pinned engine, or the first engine whose id mentions video."""
+        if self.pinned:
+            return self.pinned
+        for engine in self.engines():
+            if "video" in engine["id"].lower():
+                return engine["id"]
+        raise Exception("No video generation engine found")
+
+    def invalidate(self):
+        """Forget the cached list, e.g. after the API rejected an engine from it."""
+        with self._lock:
+            self._engines = None
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, the pinned engine and the age of the cached list."""
+        with self._lock:
+            age = time.monotonic() - self._fetched_at if self._engines is not None else None
+            return dict(self._stats, pinned=self.pinned, cached_engines=len(self._engines or []), age_seconds=age)
+
+_shared_catalogs: Dict[str, EngineCatalog] = {}
+_shared_lock = threading.Lock()
+
+def get_engine_catalog(api_key: str, fetch: Callable[[], List[Dict[str, Any]]]) -> EngineCatalog:
+    """Return the process-wide engine catalog for ``api_key``."""
+    with _shared_lock:
+        if api_key not in _shared_catalogs:
+            _shared_catalogs[api_key] = EngineCatalog(fetch)
+        return _shared_catalogs[api_key]
 
 class StabilityGenerator:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, http_pool: Optional[HTTPPool] = None):
         self.api_key = api_key
         self.base_url = "https://api.stability.ai/v1"
         self.headers = {
@@ -13,6 +159,21 @@ class StabilityGenerator:
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
+        self.scheduler = get_scheduler()
+        self.http = http_pool or get_http_pool()
+        self.engines = get_engine_catalog(self.api_key, self._list_engines)
+
+    def _post(self, url: str, payload: dict, stream: bool = False) -> requests.Response:
+        return self.http.post(url, headers=self.headers, json=payload, stream=stream)
+
+    def _get(self, url: str) -> requests.Response:
+        return self.http.get(url, headers=self.headers)
+
+    def _list_engines(self) -> List[Dict[str, Any]]:
+        return self.scheduler.submit("stability", self._get, f"{self.base_url}/engines/list").json()
+
+    def _video_url(self, engine: str) -> str:
+        return f"{self.base_url}/generation/{engine}/text-to-video"
 
     def generate_video(
         self, 
@@ -20,27 +181,29 @@ class StabilityGenerator:
         cfg_scale: float = 7.0,
         seed: int = None,
         motion_bucket_id: int = 127,
-        frames: int = 14
-    ) -> Optional[str]:
+        frames: int = 14,
+        output_type: str = "file"
+    ) -> Optional[Union[str, bytes]]:
+        """
+        Generate a video from text.
+
+        The response is streamed and its base64 artifact decoded chunk by chunk,
+        so the JSON body is never held in memory as a whole.
+
+        Args:
+            prompt (str): Text description of the video
+            cfg_scale (float): How strictly to follow the prompt
+            seed (int, optional): Seed for reproducible results
+            motion_bucket_id (int): Amount of motion
+            frames (int): Number of frames
+            output_type (str): "file" to write a uniquely named MP4 and return its path, "bytes" to return the MP4
+
+        Returns:
+            Optional[Union[str, bytes]]: Path or bytes of the video, None if generation failed
+        """
+        if output_type not in ("file", "bytes"):
+            raise ValueError(f"Unsupported output type: {output_type}")
         try:
-            # First check available engines
-            engines_url = f"{self.base_url}/engines/list"
-            engines_response = requests.get(engines_url, headers=self.headers)
-            engines_response.raise_for_status()
-            
-            # Find the video generation engine
-            video_engine = None
-            for engine in engines_response.json():
-                if "video" in engine["id"].lower():
-                    video_engine = engine["id"]
-                    break
-
-            if not video_engine:
-                raise Exception("No video generation engine found")
-
-            # Generate video
-            url = f"{self.base_url}/generation/{video_engine}/text-to-video"
-            
             payload = {
                 "text_prompts": [
                     {
@@ -54,22 +217,47 @@ class StabilityGenerator:
                 "number_of_frames": frames
             }
 
-            response = requests.post(url, headers=self.headers, json=payload)
-            response.raise_for_status()
+            # The engine comes from the shared catalog, so most calls skip /engines/list
+            video_engine = self.engines.video_engine()
+            try:
+                response = self.scheduler.submit(
+                    "stability", self._post, self._video_url(video_engine), payload, stream=True
+                )
+            except requests.HTTPError as e:
+                if not _is_engine_error(e) or self.engines.pinned:
+                    raise
+                # The cached engine was retired: rediscover once and retry
+                self.engines.invalidate()
+                video_engine = self.engines.video_engine()
+                response = self.scheduler.submit(
+                    "stability", self._post, self._video_url(video_engine), payload, stream=True
+                )
 
-            # Save the video temporarily and return the path
-            video_data = base64.b64decode(response.json()["artifacts"][0]["base64"])
-            temp_path = f"temp_video_{int(time.time())}.mp4"
-            
-            with open(temp_path, "wb") as f:
-                f.write(video_data)
-            
-            return temp_path
+            with response:
+                chunks = response.iter_content(chunk_size=Config.STABILITY_SETTINGS["decode_chunk_bytes"])
+                if output_type == "bytes":
+                    buffer = io.BytesIO()
+                    _decode_artifact(chunks, buffer)
+                    return buffer.getvalue()
+                return self._decode_to_file(chunks)
 
         except Exception as e:
             print(f"Error generating video with Stability AI: {str(e)}")
             return None
 
+    def _decode_to_file(self, chunks: Iterable[bytes]) -> str:
+        """Decode the artifact into a new file whose name no concurrent job can reuse."""
+        video_dir = Config.STABILITY_SETTINGS["video_dir"]
+        os.makedirs(video_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix="temp_video_", suffix=".mp4", dir=video_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                _decode_artifact(chunks, f)
+        except Exception:
+            self.cleanup_temp_files(temp_path)
+            raise
+        return temp_path
+
     def cleanup_temp_files(self, file_path: str):
         try:
             if os.path.exists(file_path):
@@ -0,0 +1,69 @@
+from typing import Any, Dict, List, Optional
+import threading
+from src.utils.config import Config
+from src.utils.preload import load_timings
+from .flux_generator import FluxGenerator
+from .mochi_generator import MochiGenerator
+
+GENERATORS = {
+    "flux": FluxGenerator,
+    "mochi": MochiGenerator,
+}
+
+class Warmup:
+    """
+    Loads the configured diffusion pipelines on a background thread.
+
+    Each pipeline is loaded into the shared model registry and runs one tiny
+    generation. Models are warmed one after another so two large loads never
+    compete for memory; a request arriving for a model that is still loading
+    waits on the registry's load lock instead of loading it a second time.
+    """
+
+    def __init__(self, models: Optional[List[str]] = None):
+        self.models = list(models if models is not None else Config.PRELOAD_SETTINGS["models"])
+        for name in self.models:
+            if name not in GENERATORS:
+                raise ValueError(f"Unknown model to warm up: {name}")
+        self.status = {name: "pending" for name in self.models}
+        self.errors: Dict[str, str] = {}
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "Warmup":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        for name in self.models:
+            self.status[name] = "loading"
+            try:
+                GENERATORS[name]().warm_up()
+                self.status[name] = "ready"
+            except Exception as e:
+                self.status[name] = "failed"
+                self.errors[name] = str(e)
+                print(f"Error warming up {name}: {str(e)}")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every model is warmed; returns False on timeout."""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def stats(self) -> Dict[str, Any]:
+        """Warm-up state per model plus the timing of every loading phase."""
+        return {
+            "status": dict(self.status),
+            "errors": dict(self.errors),
+            "load_timings": load_timings(),
+        }
+
+_shared_warmup: Optional[Warmup] = None
+_shared_lock = threading.Lock()
+
+def start_warmup(models: Optional[List[str]] = None) -> Warmup:
+    """Start the process-wide warm-up once; later calls return the running one."""
+    global _shared_warmup
+    with _shared_lock:
+        if _shared_warmup is None:
+            _shared_warmup = Warmup(models).start()
+        return _shared_warmup
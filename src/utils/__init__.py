@@ -1,3 +1,25 @@
 from .config import Config
+from .llm_cache import LLMCache, get_llm_cache
+from .artifact_cache import ArtifactCache, get_artifact_cache
+from .embedding_cache import EmbeddingCache, get_embedding_cache
+from .scheduler import RequestScheduler, get_scheduler
+from .model_registry import ModelRegistry, get_model_registry
+from .frame_buffer import FrameBuffer
+from .http_pool import HTTPPool, get_http_pool
 
-__all__ = ['Config']
+__all__ = [
+    'Config',
+    'LLMCache',
+    'get_llm_cache',
+    'ArtifactCache',
+    'get_artifact_cache',
+    'EmbeddingCache',
+    'get_embedding_cache',
+    'RequestScheduler',
+    'get_scheduler',
+    'ModelRegistry',
+    'get_model_registry',
+    'FrameBuffer',
+    'HTTPPool',
+    'get_http_pool',
+]
@@ -0,0 +1,171 @@
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from .config import Config
+
+class ArtifactCache:
+    """
+    Disk cache for generated images and videos.
+
+    Artifacts are stored as files under ``directory`` and indexed in SQLite,
+    keyed by a hash of the model and every parameter that determines the
+    output. Once the stored files exceed ``max_bytes`` the least recently used
+    artifacts are deleted.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        settings = Config.ARTIFACT_CACHE_SETTINGS
+        self.directory = directory or settings["directory"]
+        self.max_bytes = max_bytes if max_bytes is not None else settings["max_bytes"]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS artifacts (
+                key TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_last_access ON artifacts(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, params: Dict[str, Any]) -> str:
+        """Hash the model and generation parameters into a cache key."""
+        payload = json.dumps({"model": model, "params": params}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename[:2], filename)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the path of the cached artifact for ``key``, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT filename FROM artifacts WHERE key = ?", (key,)).fetchone()
+            if row is not None and not os.path.exists(self._path(row[0])):
+                # The file was removed behind our back
+                self._conn.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE artifacts SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return self._path(row[0])
+
+    def set(self, key: str, data: bytes, extension: str) -> str:
+        """
+        Store ``data`` as the artifact for ``key`` and evict over the size budget.
+
+        Returns:
+            str: Path of the stored file
+        """
+        filename = f"{key}.{extension}"
+        path = self._path(filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers never see a partial file
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (key, filename, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, filename, len(data), now, now),
+            )
+            self._evict(keep=key)
+            self._conn.commit()
+        return path
+
+    def _evict(self, keep: str):
+        """Delete least recently used artifacts until under ``max_bytes`` (lock held)."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+        if not self.max_bytes or total <= self.max_bytes:
+            return
+
+        stale = []
+        for key, filename, size in self._conn.execute(
+            "SELECT key, filename, size FROM artifacts ORDER BY last_access"
+        ):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            stale.append((key, filename))
+            total -= size
+
+        for key, filename in stale:
+            self._remove_file(filename)
+        self._conn.executemany("DELETE FROM artifacts WHERE key = ?", [(key,) for key, _ in stale])
+        self.evictions += len(stale)
+
+    def discard(self, key: str):
+        """Forget the artifact for ``key``, e.g. after its file turned out to be unreadable."""
+        with self._lock:
+            row = self._conn.execute("SELECT filename FROM artifacts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            self._remove_file(row[0])
+            self._conn.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _remove_file(self, filename: str):
+        try:
+            os.remove(self._path(filename))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """Delete every artifact and reset the counters."""
+        with self._lock:
+            for (filename,) in self._conn.execute("SELECT filename FROM artifacts").fetchall():
+                self._remove_file(filename)
+            self._conn.execute("DELETE FROM artifacts")
+            self._conn.commit()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters along with the current size of the cache."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+_shared_caches: Dict[str, ArtifactCache] = {}
+_shared_lock = threading.Lock()
+
+def get_artifact_cache(directory: Optional[str] = None) -> ArtifactCache:
+    """Return the process-wide cache for ``directory`` so counters are shared across generators."""
+    directory = directory or Config.ARTIFACT_CACHE_SETTINGS["directory"]
+    with _shared_lock:
+        if directory not in _shared_caches:
+            _shared_caches[directory] = ArtifactCache(directory)
+        return _shared_caches[directory]
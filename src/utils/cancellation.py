@@ -0,0 +1,114 @@
+from typing import Any, Callable, Dict, List, Optional
+import threading
+
+class GenerationCancelled(Exception):
+    """Raised inside a diffusion run once its cancellation token is cancelled."""
+
+_stats = {"cancelled_runs": 0, "steps_skipped": 0, "reclaimed_seconds": 0.0}
+_stats_lock = threading.Lock()
+
+def _record_cancellation(steps_skipped: int, step_seconds: Optional[float]):
+    with _stats_lock:
+        _stats["cancelled_runs"] += 1
+        _stats["steps_skipped"] += steps_skipped
+        if step_seconds:
+            _stats["reclaimed_seconds"] += steps_skipped * step_seconds
+
+def cancellation_stats() -> Dict[str, float]:
+    """Runs cancelled so far and the denoising compute they gave back."""
+    with _stats_lock:
+        return dict(_stats)
+
+class CancellationToken:
+    """
+    Cooperative cancellation for diffusion runs.
+
+    ``step_callback`` returns a per-step callback for the pipeline that raises
+    ``GenerationCancelled`` at the next step boundary once ``cancel`` has been
+    called, so an abandoned run stops within one step.
+
+    ``on_progress`` is only ever invoked from the thread that created the
+    token (e.g. the Streamlit script thread), either from the step callback
+    when the pipeline runs in that thread or from ``report_progress`` while it
+    waits on work running elsewhere. If the hook itself raises, for example
+    because Streamlit interrupts the script for a rerun, the token is
+    cancelled and the exception propagates.
+    """
+
+    def __init__(self, on_progress: Optional[Callable[[float], Any]] = None):
+        self.on_progress = on_progress
+        self.progress = 0.0
+        self._event = threading.Event()
+        self._owner = threading.get_ident()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self, steps_skipped: int = 0):
+        if self.cancelled:
+            _record_cancellation(steps_skipped, None)
+            raise GenerationCancelled("Generation was cancelled")
+
+    def _set_progress(self, fraction: float):
+        self.progress = fraction
+
+    def report_progress(self):
+        """Call ``on_progress`` from the owning thread, cancelling if the hook raises."""
+        if self.on_progress is None or threading.get_ident() != self._owner:
+            return
+        try:
+            self.on_progress(self.progress)
+        except BaseException:
+            self.cancel()
+            raise
+
+    def step_callback(self, total_steps: int, timer: Optional[Any] = None) -> Callable:
+        """
+        Per-step callback for ``callback_on_step_end``.
+
+        Args:
+            total_steps (int): Number of denoising steps in the run
+            timer (StepTimer, optional): Used to convert skipped steps into reclaimed seconds
+        """
+        def callback(pipe: Any, step: int, timestep: Any, callback_kwargs: Dict) -> Dict:
+            self._set_progress(min(1.0, (step + 1) / total_steps))
+            try:
+                self.report_progress()
+            except BaseException:
+                self._record(total_steps, step, timer)
+                raise
+            if self.cancelled:
+                self._record(total_steps, step, timer)
+                raise GenerationCancelled(f"Generation cancelled after {step + 1}/{total_steps} steps")
+            return callback_kwargs
+
+        return callback
+
+    def _record(self, total_steps: int, step: int, timer: Optional[Any]):
+        step_seconds = None
+        if timer is not None:
+            step_seconds = timer.stats().get("mean_step_seconds")
+        _record_cancellation(max(0, total_steps - step - 1), step_seconds)
+
+    @staticmethod
+    def all_of(tokens: List["CancellationToken"]) -> "CancellationToken":
+        """A token for shared work that counts as cancelled only once every token is."""
+        return _GroupToken(tokens)
+
+class _GroupToken(CancellationToken):
+    def __init__(self, tokens: List[CancellationToken]):
+        super().__init__()
+        self.tokens = tokens
+
+    @property
+    def cancelled(self) -> bool:
+        return all(token.cancelled for token in self.tokens)
+
+    def _set_progress(self, fraction: float):
+        self.progress = fraction
+        for token in self.tokens:
+            token.progress = fraction
@@ -37,6 +37,231 @@ class Config:
     }
 
     PDF_SETTINGS = {
-        "temp_directory": "temp_pdfs",
-        "default_filename": "generated_document.pdf"
-    } 
\ No newline at end of file
+        "default_filename": "generated_document.pdf",
+        # TrueType fonts to register once per process (name -> .ttf path)
+        "fonts": {},
+        # Font used by the document styles; None keeps reportlab's default
+        "font_name": None
+    }
+
+    CONTENT_SETTINGS = {
+        "max_concurrency": 8,
+        # "concurrent", "batched_section" or "batched_document"
+        "strategy": "concurrent"
+    }
+
+
+    LLM_CACHE_SETTINGS = {
+        "enabled": True,
+        "path": os.path.join(".cache", "llm_cache.sqlite3"),
+        "max_bytes": 64 * 1024 * 1024,  # 64 MB of cached text
+        "ttl_seconds": 7 * 24 * 3600  # 7 days
+    }
+
+    GPT4ALL_SETTINGS = {
+        "model": "ggml-gpt4all-j-v1.3-groovy",
+        "max_batch_size": 8,
+        "batch_wait_seconds": 0.02,  # How long the worker waits to group queued prompts
+        "request_timeout": 300
+    }
+
+    # Per-provider token buckets used by the shared request scheduler
+    RATE_LIMITS = {
+        "openai": {"requests_per_second": 5.0, "burst": 10},
+        "prodia": {"requests_per_second": 2.0, "burst": 5},
+        "stability": {"requests_per_second": 1.0, "burst": 2},
+        "pollinations": {"requests_per_second": 2.0, "burst": 5},
+        "default": {"requests_per_second": 1.0, "burst": 1}
+    }
+
+    SCHEDULER_SETTINGS = {
+        "max_retries": 5,
+        "base_backoff_seconds": 1.0,
+        "max_backoff_seconds": 60.0
+    }
+
+    BATCH_SETTINGS = {
+        "output_directory": "batch_output",
+        "concurrency": 4,  # Documents generated at the same time
+        "render_workers": os.cpu_count() or 1  # Processes used for PDF layout
+    }
+
+    MODEL_REGISTRY_SETTINGS = {
+        # Total size of FLUX/Mochi pipelines kept resident before the least recently used is evicted
+        "memory_budget_gb": 48
+    }
+
+    FLUX_SETTINGS = {
+        "max_batch_size": 4,  # Upper bound on images per pipeline call
+        "per_image_memory_gb": 6.0,  # Estimated activation memory per image in a batch
+        "batch_window_seconds": 0.25,  # How long the shared queue collects concurrent requests
+        "cross_session_batching": True
+    }
+
+    DIFFUSION_SETTINGS = {
+        # Default entry of PERFORMANCE_PROFILES used by FluxGenerator and MochiGenerator
+        "profile": "default"
+    }
+
+    # Optimizations applied when loading and running the diffusion pipelines
+    PERFORMANCE_PROFILES = {
+        "default": {},
+        "bf16": {
+            "dtype": "bfloat16",
+            "autocast": True,
+            "channels_last": True
+        },
+        "bf16-compiled": {
+            "dtype": "bfloat16",
+            "autocast": True,
+            "channels_last": True,
+            "compile": True
+        },
+        "low-memory": {
+            "attention_slicing": True,
+            "vae_tiling": True
+        },
+        "bf16-low-memory": {
+            "dtype": "bfloat16",
+            "autocast": True,
+            "attention_slicing": True,
+            "vae_tiling": True,
+            "num_threads": os.cpu_count()
+        }
+    }
+
+    # Samplers for FLUX/Mochi; "config" overrides are applied on top of the pipeline's scheduler config.
+    # Both models are flow-matching, so DPM-Solver++/UniPC run with flow sigmas and need a diffusers
+    # version whose set_timesteps accepts the pipeline's custom sigmas.
+    SCHEDULERS = {
+        "default": None,
+        "euler": {"class": "FlowMatchEulerDiscreteScheduler"},
+        "euler-karras": {
+            "class": "FlowMatchEulerDiscreteScheduler",
+            "config": {"use_karras_sigmas": True}
+        },
+        "euler-beta": {
+            "class": "FlowMatchEulerDiscreteScheduler",
+            "config": {"use_beta_sigmas": True}
+        },
+        "dpm++": {
+            "class": "DPMSolverMultistepScheduler",
+            "config": {
+                "algorithm_type": "dpmsolver++",
+                "prediction_type": "flow_prediction",
+                "use_flow_sigmas": True
+            }
+        },
+        "unipc": {
+            "class": "UniPCMultistepScheduler",
+            "config": {"prediction_type": "flow_prediction", "use_flow_sigmas": True}
+        }
+    }
+
+    # Latency/quality presets pairing a scheduler with a step count; the fast ones use
+    # multistep solvers, which lose less detail than Euler at low step counts
+    SAMPLER_PRESETS = {
+        "Quality": {"scheduler": "default", "steps": 50},
+        "Balanced": {"scheduler": "dpm++", "steps": 20},
+        "Draft": {"scheduler": "unipc", "steps": 12},
+        "Quick draft": {"scheduler": "unipc", "steps": 8}
+    }
+
+    # Encoding of generated videos (Mochi); frames are encoded on a background thread
+    VIDEO_ENCODING_SETTINGS = {
+        "container": "mp4",
+        "fps": 8,
+        "max_queued_frames": 32
+    }
+
+    VIDEO_FORMATS = {
+        "mp4": {
+            "codec": "libx264",
+            "mime": "video/mp4",
+            "options": {"crf": "23", "preset": "veryfast"}
+        },
+        "webm": {
+            "codec": "libvpx-vp9",
+            "mime": "video/webm",
+            "options": {"crf": "32", "b": "0", "deadline": "realtime", "cpu-used": "8"}
+        }
+    }
+
+    # Background warm-up of diffusion pipelines when the app starts
+    PRELOAD_SETTINGS = {
+        "enabled": False,  # opt in: downloads and loads multi-GB pipelines on every app/worker start
+        "models": ["flux"],  # any of "flux", "mochi"
+        "snapshot_dir": None,  # None uses the Hugging Face cache
+        "local_files_only": False,  # download a snapshot when none is cached; True never downloads
+        # Component weights live in subfolders; skips e.g. FLUX's duplicate single-file checkpoint
+        "allow_patterns": ["*.json", "*.txt", "*.model", "*/*.safetensors"],
+        "warmup_steps": 2
+    }
+
+    # Disk cache of generated images/videos, used for requests with an explicit seed
+    ARTIFACT_CACHE_SETTINGS = {
+        "enabled": True,
+        "directory": os.path.join(".cache", "artifacts"),
+        "max_bytes": 2 * 1024 * 1024 * 1024  # 2 GB of cached media
+    }
+
+    # In-memory LRU of text-encoder outputs reused across FLUX/Mochi requests
+    EMBEDDING_CACHE_SETTINGS = {
+        "enabled": True,
+        "max_bytes": 1024 * 1024 * 1024  # 1 GB of cached embeddings
+    }
+
+    # Long Mochi videos are generated as overlapping chunks. Both frame counts must be
+    # 6k + 1 (the VAE's temporal compression) so chunk boundaries fall on latent frames.
+    LONG_VIDEO_SETTINGS = {
+        "chunk_frames": 31,
+        "overlap_frames": 7,
+        "max_frames": 301
+    }
+
+    # Out-of-process FLUX/Mochi inference; when enabled the app submits jobs to worker processes
+    INFERENCE_SERVICE_SETTINGS = {
+        "enabled": False,
+        "num_workers": 2,
+        "profile": None,  # None uses DIFFUSION_SETTINGS["profile"]
+        "devices": None  # CUDA device ids to spread workers over; None uses every visible GPU
+    }
+
+    # Prodia jobs are submitted and polled asynchronously by one shared tracker
+    PRODIA_SETTINGS = {
+        "deadline_seconds": 300,  # a job still pending after this fails with TimeoutError
+        "initial_estimate_seconds": 5.0,  # first poll delay until completion times have been observed
+        "min_poll_seconds": 0.5,
+        "max_poll_seconds": 10.0,
+        "poll_backoff": 1.5,  # poll interval growth once a job runs past its expected time
+        "completion_window": 50  # recent completion times used to estimate the next one
+    }
+
+    # Keep-alive connection pools shared by the remote generators (Prodia, Pollinations, Stability)
+    HTTP_POOL_SETTINGS = {
+        "default_pool_size": 10,
+        "host_pool_sizes": {
+            "api.prodia.com": 20,  # concurrent job polls
+            "image.pollinations.ai": 10,
+            "api.stability.ai": 4
+        },
+        "connect_timeout": 5.0,
+        "read_timeout": 120.0,  # Stability returns the finished video in the response
+        "gzip": True,
+        "error_body_bytes": 65536  # kept from failed streamed responses so callers can read the error
+    }
+
+    # Stability engine discovery; set "engine" to pin one and skip /engines/list entirely
+    STABILITY_SETTINGS = {
+        "engine": os.getenv("STABILITY_VIDEO_ENGINE") or None,
+        "engine_ttl_seconds": 3600,
+        "engine_refresh_after_seconds": 2700,  # past this age the list is refreshed in the background
+        "video_dir": ".cache/stability",  # generated videos get unique names here
+        "decode_chunk_bytes": 64 * 1024,  # response bytes decoded at a time
+        # Serve videos with HTTP Range support so players seek without the app loading the file
+        "range_server": False,
+        "range_server_host": "127.0.0.1",
+        "range_server_port": 8502,
+        "range_server_url": None,  # public base URL if the player reaches the server through a proxy
+        "video_max_age_seconds": 3600  # served videos older than this are deleted
+    }
\ No newline at end of file
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import threading
+from .config import Config
+
+def _nbytes(tensors: Tuple[Any, ...]) -> int:
+    return sum(t.numel() * t.element_size() for t in tensors if t is not None)
+
+class EmbeddingCache:
+    """
+    In-memory LRU cache of prompt embeddings.
+
+    Text encoders are deterministic, so the embeddings of a prompt computed
+    once can be passed to the pipeline by every later request using the same
+    pipeline. Tensors stay on the device they were computed on; the least
+    recently used entries are dropped once they take more than ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else Config.EMBEDDING_CACHE_SETTINGS["max_bytes"]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[Any, ...], int]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Tuple[Any, ...]]) -> Tuple[Any, ...]:
+        """
+        Return the embeddings cached under ``key``, computing and caching them on a miss.
+
+        Args:
+            key (Hashable): Identifies the pipeline and prompt, e.g. (registry key, text)
+            compute (Callable): Runs the text encoders and returns a tuple of tensors
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = compute()
+        nbytes = _nbytes(value)
+        if nbytes > self.max_bytes:
+            return value
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, nbytes)
+                self._size += nbytes
+                while self._size > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._size -= evicted
+                    self.evictions += 1
+        return value
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters along with the memory held by cached embeddings."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+_shared_cache: Optional[EmbeddingCache] = None
+_shared_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache shared by every generator and session."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache()
+        return _shared_cache
@@ -0,0 +1,75 @@
+from multiprocessing import shared_memory
+from typing import Iterator, Optional, Tuple
+import numpy as np
+from PIL import Image
+
+class FrameBuffer:
+    """
+    A video clip held as one contiguous uint8 array of shape (frames, height, width, channels).
+
+    Frames are views into the array, so encoders and previews read them
+    without copying. With ``shared=True`` the array lives in a named
+    shared-memory block that another process can map with ``attach``; the
+    creating buffer owns the block and frees it in ``close``.
+    """
+
+    def __init__(self, shape: Tuple[int, int, int, int], shared: bool = False):
+        self.shape = tuple(shape)
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._owner = True
+        if shared:
+            self._shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(self.shape))))
+            self.array = np.ndarray(self.shape, dtype=np.uint8, buffer=self._shm.buf)
+        else:
+            self.array = np.empty(self.shape, dtype=np.uint8)
+
+    @classmethod
+    def attach(cls, name: str, shape: Tuple[int, int, int, int]) -> "FrameBuffer":
+        """Map a shared buffer created by another process; closing it leaves the block alive."""
+        buffer = cls.__new__(cls)
+        buffer.shape = tuple(shape)
+        buffer._shm = shared_memory.SharedMemory(name=name)
+        buffer._owner = False
+        buffer.array = np.ndarray(buffer.shape, dtype=np.uint8, buffer=buffer._shm.buf)
+        return buffer
+
+    @property
+    def name(self) -> Optional[str]:
+        """Shared-memory block name to pass to ``attach``, or None for a private buffer."""
+        return self._shm.name if self._shm is not None else None
+
+    @property
+    def nbytes(self) -> int:
+        return self.array.nbytes
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.array[index]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        return iter(self.array)
+
+    def to_pil(self, index: int) -> Image.Image:
+        """Return one frame as a PIL image (this copies the frame)."""
+        return Image.fromarray(self.array[index])
+
+    def close(self):
+        """Drop the array; the creator of a shared buffer also frees the block."""
+        self.array = None
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except BufferError:
+                # Frame views are still referenced elsewhere; the mapping goes with the last one
+                pass
+            if self._owner:
+                self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self) -> "FrameBuffer":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
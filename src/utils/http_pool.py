@@ -0,0 +1,115 @@
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from .config import Config
+
+class HTTPPool:
+    """
+    Shared keep-alive HTTP session for the remote generators.
+
+    Connections are pooled per host and reused across requests, so only the
+    first request to a host pays for the TCP and TLS handshakes. Hosts listed
+    in ``host_pool_sizes`` get their own pool of that size; every request gets
+    the configured connect/read timeouts unless the caller passes ``timeout``.
+    Retries are left to the RequestScheduler.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = settings or Config.HTTP_POOL_SETTINGS
+        self.timeout: Tuple[float, float] = (self.settings["connect_timeout"], self.settings["read_timeout"])
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        # Mostly shrinks the JSON responses; binary media is already compressed
+        self.session.headers["Accept-Encoding"] = "gzip, deflate" if self.settings["gzip"] else "identity"
+        default_adapter = self._adapter(self.settings["default_pool_size"])
+        self.session.mount("https://", default_adapter)
+        self.session.mount("http://", default_adapter)
+        for host, size in self.settings["host_pool_sizes"].items():
+            self.session.mount(f"https://{host}", self._adapter(size))
+
+    def _adapter(self, pool_size: int) -> HTTPAdapter:
+        # pool_block caps open connections at pool_size instead of opening throwaway ones
+        return HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+
+    @property
+    def default_headers(self) -> Dict[str, str]:
+        """Headers every pooled request sends, for clients that build their own requests."""
+        return {"Accept-Encoding": self.session.headers["Accept-Encoding"]}
+
+    def pool_size(self, url: str) -> int:
+        """Return the connection pool size used for ``url``'s host."""
+        host = urlsplit(url).hostname
+        return self.settings["host_pool_sizes"].get(host, self.settings["default_pool_size"])
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """Send a request over a pooled connection; raises for HTTP error statuses."""
+        kwargs.setdefault("timeout", self.timeout)
+        with self._lock:
+            self.requests += 1
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        try:
+            response.raise_for_status()
+        except Exception:
+            # Streamed responses hold their connection until closed; with pool_block a leak stalls the pool.
+            # Buffer the start of the body first so callers can still read the error from e.response
+            if not response._content_consumed:
+                try:
+                    response._content = response.raw.read(self.settings["error_body_bytes"], decode_content=True)
+                except Exception:
+                    response._content = b""
+                response._content_consumed = True
+            response.close()
+            with self._lock:
+                self.errors += 1
+            raise
+        return response
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def head(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request counters and, per host, connections opened versus requests served."""
+        hosts = {}
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = hosts.setdefault(key.key_host, {"connections_opened": 0, "requests": 0})
+                host["connections_opened"] += pool.num_connections
+                host["requests"] += pool.num_requests
+        for host in hosts.values():
+            host["reuse_rate"] = 1 - host["connections_opened"] / host["requests"] if host["requests"] else 0.0
+        return {"requests": self.requests, "errors": self.errors, "hosts": hosts}
+
+    def close(self):
+        """Close every pooled connection."""
+        self.session.close()
+
+_shared_pool: Optional[HTTPPool] = None
+_shared_lock = threading.Lock()
+
+def get_http_pool() -> HTTPPool:
+    """Return the process-wide HTTP pool shared by every remote generator."""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = HTTPPool()
+        return _shared_pool
@@ -0,0 +1,156 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+import gc
+import threading
+import time
+import weakref
+from .config import Config
+
+def pipeline_nbytes(pipe: Any) -> int:
+    """Bytes held by the parameters and buffers of every module in a diffusers pipeline."""
+    components = getattr(pipe, "components", None) or {"model": pipe}
+    total = 0
+    for component in components.values():
+        for tensors in (getattr(component, "parameters", None), getattr(component, "buffers", None)):
+            if callable(tensors):
+                total += sum(t.numel() * t.element_size() for t in tensors())
+    return total
+
+class ModelRegistry:
+    """
+    Keeps loaded pipelines resident across sessions and Streamlit reruns.
+
+    Pipelines are loaded on first use and kept until the total size of the
+    resident pipelines would exceed the memory budget; the least recently used
+    pipeline is evicted first. A pipeline still referenced by a running
+    generation is only freed once that generation finishes.
+    """
+
+    def __init__(self, memory_budget_bytes: Optional[int] = None):
+        if memory_budget_bytes is None:
+            memory_budget_bytes = int(Config.MODEL_REGISTRY_SETTINGS["memory_budget_gb"] * 1024 ** 3)
+        self.memory_budget_bytes = memory_budget_bytes
+        self._models: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._stats = {"hits": 0, "loads": 0, "evictions": 0, "load_seconds": 0.0}
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Return the resident pipeline for ``key``, calling ``loader`` if it is not loaded.
+
+        Args:
+            key (str): Identifies the pipeline, e.g. the model id plus any load options
+            loader (Callable): Loads and returns the pipeline
+
+        Returns:
+            Any: The loaded pipeline
+        """
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry["pipe"]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given model; others wait and then hit the registry
+        with load_lock:
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    self._models.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry["pipe"]
+
+            start = time.perf_counter()
+            pipe = loader()
+            load_seconds = time.perf_counter() - start
+            nbytes = pipeline_nbytes(pipe)
+
+            with self._lock:
+                self._make_room(nbytes)
+                self._models[key] = {"pipe": pipe, "nbytes": nbytes, "load_seconds": load_seconds}
+                self._stats["loads"] += 1
+                self._stats["load_seconds"] += load_seconds
+            return pipe
+
+    def _make_room(self, nbytes: int):
+        """Evict least recently used pipelines until ``nbytes`` more fit the budget (lock held)."""
+        evicted = False
+        while self._models and self._resident_bytes() + nbytes > self.memory_budget_bytes:
+            self._models.popitem(last=False)
+            self._stats["evictions"] += 1
+            evicted = True
+        if evicted:
+            _release_memory()
+
+    def _resident_bytes(self) -> int:
+        return sum(entry["nbytes"] for entry in self._models.values())
+
+    def evict(self, key: str) -> bool:
+        """Drop ``key`` from the registry; returns False if it was not resident."""
+        with self._lock:
+            if self._models.pop(key, None) is None:
+                return False
+            self._stats["evictions"] += 1
+        _release_memory()
+        return True
+
+    def clear(self):
+        """Evict every resident pipeline."""
+        with self._lock:
+            self._stats["evictions"] += len(self._models)
+            self._models.clear()
+        _release_memory()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return load/evict counters and the pipelines currently resident."""
+        with self._lock:
+            return dict(
+                self._stats,
+                resident={
+                    key: {"gb": entry["nbytes"] / 1024 ** 3, "load_seconds": entry["load_seconds"]}
+                    for key, entry in self._models.items()
+                },
+                resident_gb=self._resident_bytes() / 1024 ** 3,
+                budget_gb=self.memory_budget_bytes / 1024 ** 3,
+            )
+
+def _release_memory():
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+_pipeline_locks: "weakref.WeakKeyDictionary[Any, threading.RLock]" = weakref.WeakKeyDictionary()
+_pipeline_locks_guard = threading.Lock()
+
+def pipeline_lock(pipe: Any) -> threading.RLock:
+    """
+    Return the lock that serializes calls into ``pipe``.
+
+    A resident pipeline is shared by every session, the batch queue and the
+    warm-up thread, and diffusers keeps per-call state (step index, timesteps,
+    guidance scale) on the pipeline and its scheduler, so only one call may
+    run at a time. Re-entrant, so a generation can hold it across several calls.
+    """
+    with _pipeline_locks_guard:
+        lock = _pipeline_locks.get(pipe)
+        if lock is None:
+            lock = _pipeline_locks[pipe] = threading.RLock()
+        return lock
+
+_shared_registry: Optional[ModelRegistry] = None
+_shared_lock = threading.Lock()
+
+def get_model_registry() -> ModelRegistry:
+    """Return the process-wide registry shared by every generator and session."""
+    global _shared_registry
+    with _shared_lock:
+        if _shared_registry is None:
+            _shared_registry = ModelRegistry()
+        return _shared_registry
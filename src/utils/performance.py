@@ -0,0 +1,171 @@
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import statistics
+import threading
+import time
+import torch
+from .config import Config
+
+def get_profile(name: str) -> Dict[str, Any]:
+    """Return the settings of a performance profile from ``Config.PERFORMANCE_PROFILES``."""
+    if name not in Config.PERFORMANCE_PROFILES:
+        raise ValueError(f"Unknown performance profile: {name}")
+    return Config.PERFORMANCE_PROFILES[name]
+
+def load_kwargs(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Extra ``from_pretrained`` arguments for a profile."""
+    if profile.get("dtype"):
+        return {"torch_dtype": getattr(torch, profile["dtype"])}
+    return {}
+
+def _denoiser(pipe: Any) -> Optional[torch.nn.Module]:
+    return getattr(pipe, "transformer", None) or getattr(pipe, "unet", None)
+
+def apply_profile(pipe: Any, profile: Dict[str, Any]) -> Any:
+    """Apply the load-time optimizations of a profile to a freshly loaded pipeline."""
+    if profile.get("attention_slicing") and hasattr(pipe, "enable_attention_slicing"):
+        pipe.enable_attention_slicing()
+
+    if profile.get("vae_tiling"):
+        if hasattr(pipe, "enable_vae_tiling"):
+            pipe.enable_vae_tiling()
+        elif hasattr(getattr(pipe, "vae", None), "enable_tiling"):
+            pipe.vae.enable_tiling()
+
+    if profile.get("channels_last"):
+        for module in (_denoiser(pipe), getattr(pipe, "vae", None)):
+            if module is not None:
+                try:
+                    module.to(memory_format=torch.channels_last)
+                except (RuntimeError, TypeError):
+                    # 3D/5D weights (e.g. video VAEs) have no channels_last layout
+                    pass
+
+    if profile.get("compile"):
+        denoiser = _denoiser(pipe)
+        if denoiser is not None:
+            compiled = torch.compile(denoiser, mode=profile.get("compile_mode", "default"))
+            if hasattr(pipe, "transformer"):
+                pipe.transformer = compiled
+            else:
+                pipe.unet = compiled
+
+    return pipe
+
+@contextmanager
+def inference_context(profile: Dict[str, Any]) -> Iterator[None]:
+    """
+    Thread count and autocast settings a profile applies around each pipeline call.
+
+    torch's intra-op thread pool is process-wide, so the thread count is set
+    but not restored; restoring it would undo the setting of a concurrent call.
+    """
+    if profile.get("num_threads") and torch.get_num_threads() != profile["num_threads"]:
+        torch.set_num_threads(profile["num_threads"])
+    if profile.get("autocast"):
+        dtype = getattr(torch, profile.get("dtype") or "bfloat16")
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        with torch.autocast(device, dtype=dtype):
+            yield
+    else:
+        yield
+
+class StepTimer:
+    """
+    Per-step callback recording the latency of each denoising step.
+
+    Pass it as ``callback_on_step_end``. The first interval also covers prompt
+    encoding and latent setup, so it is left out of the summary when there
+    are more steps.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.durations: List[float] = []
+
+    def __call__(self, pipe: Any, step: int, timestep: Any, callback_kwargs: Dict) -> Dict:
+        now = time.perf_counter()
+        self.durations.append(now - self._last)
+        self._last = now
+        return callback_kwargs
+
+    def stats(self) -> Dict[str, float]:
+        durations = self.durations[1:] if len(self.durations) > 1 else self.durations
+        if not durations:
+            return {"steps": 0}
+        return {
+            "steps": len(self.durations),
+            "mean_step_seconds": statistics.fmean(durations),
+            "median_step_seconds": statistics.median(durations),
+            "max_step_seconds": max(durations),
+            "total_seconds": self._last - self.started,
+        }
+
+def compose_step_callbacks(*callbacks: Optional[Callable]) -> Optional[Callable]:
+    """Chain several ``callback_on_step_end`` callables into one."""
+    callbacks = [callback for callback in callbacks if callback is not None]
+    if not callbacks:
+        return None
+    if len(callbacks) == 1:
+        return callbacks[0]
+
+    def combined(pipe: Any, step: int, timestep: Any, callback_kwargs: Dict) -> Dict:
+        for callback in callbacks:
+            callback_kwargs = callback(pipe, step, timestep, callback_kwargs) or callback_kwargs
+        return callback_kwargs
+
+    return combined
+
+_latency_reports: Dict[str, Dict[str, List[float]]] = {}
+_report_lock = threading.Lock()
+
+def record_step_latency(model: str, profile: str, timer: StepTimer):
+    """Add a finished run's step timings to the per-model, per-profile report."""
+    stats = timer.stats()
+    if not stats["steps"]:
+        return
+    with _report_lock:
+        _latency_reports.setdefault(model, {}).setdefault(profile, []).append(stats["mean_step_seconds"])
+
+def step_latency_report() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Mean per-step latency measured so far for every model and profile."""
+    with _report_lock:
+        return {
+            model: {
+                profile: {
+                    "runs": len(samples),
+                    "mean_step_seconds": statistics.fmean(samples),
+                    "best_step_seconds": min(samples),
+                }
+                for profile, samples in profiles.items()
+            }
+            for model, profiles in _latency_reports.items()
+        }
+
+def benchmark_profiles(
+    run: Callable[[str], StepTimer],
+    profiles: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Measure per-step latency of each profile on this host.
+
+    Args:
+        run (Callable): Runs a short generation with the given profile name and
+            returns its ``StepTimer``, e.g. ``FluxGenerator.benchmark``
+        profiles (List[str], optional): Profiles to try; defaults to all configured ones
+
+    Returns:
+        Dict[str, Dict[str, float]]: Step statistics per profile, fastest first
+    """
+    results = {}
+    for name in profiles or list(Config.PERFORMANCE_PROFILES):
+        try:
+            results[name] = run(name).stats()
+        except Exception as e:
+            results[name] = {"steps": 0, "error": str(e)}
+
+    return dict(sorted(
+        results.items(),
+        key=lambda item: item[1].get("mean_step_seconds", float("inf"))
+    ))
@@ -0,0 +1,62 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+import threading
+import time
+from .config import Config
+
+_snapshots: Dict[str, str] = {}
+_load_timings: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+
+def local_snapshot(model_id: str) -> str:
+    """
+    Return a local directory holding ``model_id``'s pipeline files.
+
+    An existing snapshot is used without contacting the Hub; it is only
+    downloaded when missing and ``Config.PRELOAD_SETTINGS["local_files_only"]``
+    is off.
+    """
+    with _lock:
+        if model_id in _snapshots:
+            return _snapshots[model_id]
+
+    from huggingface_hub import snapshot_download
+    from huggingface_hub.utils import LocalEntryNotFoundError
+
+    settings = Config.PRELOAD_SETTINGS
+    kwargs = {"cache_dir": settings["snapshot_dir"], "allow_patterns": settings["allow_patterns"]}
+    try:
+        path = snapshot_download(model_id, local_files_only=True, **kwargs)
+    except LocalEntryNotFoundError:
+        if settings["local_files_only"]:
+            raise
+        path = snapshot_download(model_id, **kwargs)
+
+    with _lock:
+        _snapshots[model_id] = path
+    return path
+
+def pretrained_kwargs() -> Dict[str, Any]:
+    """
+    ``from_pretrained`` arguments for fast loading.
+
+    safetensors weights are memory-mapped rather than read into a state dict
+    first, and low_cpu_mem_usage skips the random initialisation of weights
+    that are about to be overwritten.
+    """
+    return {"use_safetensors": True, "low_cpu_mem_usage": True}
+
+@contextmanager
+def timed(key: str, phase: str) -> Iterator[None]:
+    """Record how long one loading phase of ``key`` took."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _load_timings.setdefault(key, {})[phase] = time.perf_counter() - start
+
+def load_timings() -> Dict[str, Dict[str, float]]:
+    """Seconds spent in each loading phase, per pipeline."""
+    with _lock:
+        return {key: dict(phases) for key, phases in _load_timings.items()}
@@ -0,0 +1,134 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import quote, unquote, urlsplit
+import mimetypes
+import os
+import re
+import threading
+import time
+from .config import Config
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+class _RangeRequestHandler(BaseHTTPRequestHandler):
+    """Serves files from the server's directory, answering single byte-range requests with 206."""
+
+    def _byte_range(self, size: int) -> Optional[Tuple[int, int]]:
+        match = _RANGE.match(self.headers.get("Range", "").strip())
+        if match is None or match.groups() == ("", ""):
+            return None
+        start, end = match.groups()
+        if not start:
+            # Suffix range: the last N bytes
+            return max(0, size - int(end)), size - 1
+        return int(start), min(int(end), size - 1) if end else size - 1
+
+    def _send(self, body: bool):
+        name = os.path.basename(unquote(urlsplit(self.path).path))
+        path = os.path.join(self.server.directory, name)
+        if not name or not os.path.isfile(path):
+            self.send_error(404)
+            return
+
+        size = os.path.getsize(path)
+        byte_range = self._byte_range(size)
+        if byte_range is not None and byte_range[0] > byte_range[1]:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start, end = byte_range or (0, size - 1)
+        self.send_response(206 if byte_range else 200)
+        self.send_header("Content-Type", mimetypes.guess_type(name)[0] or "application/octet-stream")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if byte_range:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if not body:
+            return
+
+        remaining = end - start + 1
+        with open(path, "rb") as f:
+            f.seek(start)
+            while remaining > 0:
+                chunk = f.read(min(remaining, 64 * 1024))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def do_GET(self):
+        self._send(body=True)
+
+    def do_HEAD(self):
+        self._send(body=False)
+
+    def log_message(self, format: str, *args):
+        pass
+
+class RangeFileServer:
+    """
+    HTTP server for generated videos that supports byte-range requests.
+
+    The player fetches (and seeks within) the file straight from disk, so the
+    app never has to read a video into memory to display it. Files older than
+    ``max_age_seconds`` are deleted whenever a new one is published.
+    """
+
+    def __init__(self, directory: str, host: str, port: int, base_url: Optional[str] = None,
+                 max_age_seconds: Optional[float] = None):
+        self.directory = directory
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(directory, exist_ok=True)
+        self._server = ThreadingHTTPServer((host, port), _RangeRequestHandler)
+        self._server.directory = directory
+        self._server.daemon_threads = True
+        self.base_url = (base_url or f"http://{host}:{self._server.server_port}").rstrip("/")
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def url_for(self, path: str) -> str:
+        """Return the URL serving ``path``, which must be inside the server's directory."""
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(self.directory):
+            raise ValueError(f"{path} is not in {self.directory}")
+        self.prune(keep=path)
+        return f"{self.base_url}/{quote(os.path.basename(path))}"
+
+    def prune(self, keep: Optional[str] = None):
+        """Delete served files older than ``max_age_seconds``."""
+        if not self.max_age_seconds:
+            return
+        cutoff = time.time() - self.max_age_seconds
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+_shared_server: Optional[RangeFileServer] = None
+_shared_lock = threading.Lock()
+
+def get_range_server() -> RangeFileServer:
+    """Return the process-wide server for Stability videos, starting it on first use."""
+    global _shared_server
+    with _shared_lock:
+        if _shared_server is None:
+            settings = Config.STABILITY_SETTINGS
+            _shared_server = RangeFileServer(
+                settings["video_dir"],
+                settings["range_server_host"],
+                settings["range_server_port"],
+                base_url=settings["range_server_url"],
+                max_age_seconds=settings["video_max_age_seconds"],
+            )
+        return _shared_server
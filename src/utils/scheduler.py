@@ -0,0 +1,291 @@
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+import httpx
+import openai
+import requests
+from .config import Config
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+# Statuses that mean "try again later" rather than "this request is wrong"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Transient network failures that carry no HTTP status (APITimeoutError subclasses APIConnectionError)
+RETRY_EXCEPTIONS = (
+    openai.APIConnectionError,
+    requests.ConnectionError,
+    requests.Timeout,
+    httpx.TransportError,
+    ConnectionError,
+    TimeoutError,
+)
+
+def _retry_info(error: Exception) -> Tuple[Optional[int], Optional[float]]:
+    """Extract the HTTP status and Retry-After delay from a requests/OpenAI error."""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    headers = getattr(response, "headers", None) or {}
+
+    retry_after = headers.get("Retry-After") or headers.get("retry-after")
+    if retry_after is None:
+        return status, None
+    try:
+        return status, max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return status, max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return status, None
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` tokens per second, holding at most ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token can be taken (0 if one is available now)."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def block_for(self, seconds: float):
+        """Pause the bucket, e.g. after the provider answered 429."""
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 0.0
+        self.updated = max(self.updated, now)
+
+class RequestScheduler:
+    """
+    Shared scheduler for outbound provider calls.
+
+    Every provider has a token bucket sized from ``Config.RATE_LIMITS``.
+    Callers wait in a per-provider priority queue until a token is available.
+    When the provider answers 429 or a 5xx, the whole provider is paused for
+    the ``Retry-After`` delay (or an exponential backoff with jitter) and the
+    call is retried, so callers do not stampede an already throttled API.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, float]]] = None,
+        max_retries: Optional[int] = None,
+        base_backoff: Optional[float] = None,
+        max_backoff: Optional[float] = None,
+    ):
+        settings = Config.SCHEDULER_SETTINGS
+        self.limits = limits or Config.RATE_LIMITS
+        self.max_retries = max_retries if max_retries is not None else settings["max_retries"]
+        self.base_backoff = base_backoff if base_backoff is not None else settings["base_backoff_seconds"]
+        self.max_backoff = max_backoff if max_backoff is not None else settings["max_backoff_seconds"]
+
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._queues: Dict[str, list] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._seq = itertools.count()
+
+    def _provider(self, provider: str) -> TokenBucket:
+        """Return the bucket for ``provider``, creating it on first use (lock held)."""
+        if provider not in self._buckets:
+            limit = self.limits.get(provider, self.limits["default"])
+            self._buckets[provider] = TokenBucket(limit["requests_per_second"], limit["burst"])
+            self._queues[provider] = []
+            self._stats[provider] = {
+                "attempts": 0,
+                "completed": 0,
+                "failed": 0,
+                "retries": 0,
+                "throttled": 0,
+                "wait_seconds": 0.0,
+            }
+        return self._buckets[provider]
+
+    def _try_acquire(self, provider: str, ticket: Tuple[int, int]) -> float:
+        """Take a token if ``ticket`` is first in line; otherwise return how long to wait."""
+        bucket = self._provider(provider)
+        queue = self._queues[provider]
+        if queue[0] != ticket:
+            return 0.05
+        wait = bucket.wait_time(time.monotonic())
+        if wait > 0:
+            return wait
+        bucket.take()
+        heapq.heappop(queue)
+        self._cond.notify_all()
+        return 0.0
+
+    def _enqueue(self, provider: str, priority: int) -> Tuple[int, int]:
+        self._provider(provider)
+        ticket = (priority, next(self._seq))
+        heapq.heappush(self._queues[provider], ticket)
+        self._stats[provider]["attempts"] += 1
+        return ticket
+
+    def _dequeue(self, provider: str, ticket: Tuple[int, int]):
+        """Drop a ticket that gave up waiting (lock held)."""
+        queue = self._queues[provider]
+        if ticket in queue:
+            queue.remove(ticket)
+            heapq.heapify(queue)
+            self._cond.notify_all()
+
+    def _acquire(self, provider: str, priority: int):
+        start = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(provider, priority)
+            try:
+                while True:
+                    wait = self._try_acquire(provider, ticket)
+                    if wait == 0:
+                        break
+                    self._cond.wait(timeout=min(wait, 1.0))
+            except BaseException:
+                self._dequeue(provider, ticket)
+                raise
+            self._stats[provider]["wait_seconds"] += time.monotonic() - start
+
+    async def _aacquire(self, provider: str, priority: int):
+        start = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(provider, priority)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_acquire(provider, ticket)
+                if wait == 0:
+                    break
+                await asyncio.sleep(min(wait, 0.25))
+        except BaseException:
+            with self._cond:
+                self._dequeue(provider, ticket)
+            raise
+        with self._cond:
+            self._stats[provider]["wait_seconds"] += time.monotonic() - start
+
+    def _should_retry(self, provider: str, error: Exception, attempt: int) -> bool:
+        """Record a failed attempt and, if it is retryable, pause the provider before retrying."""
+        status, retry_after = _retry_info(error)
+        with self._cond:
+            stats = self._stats[provider]
+            retryable = status in RETRY_STATUSES or isinstance(error, RETRY_EXCEPTIONS)
+            if not retryable or attempt >= self.max_retries:
+                stats["failed"] += 1
+                return False
+
+            if retry_after is not None:
+                delay = retry_after + random.uniform(0, self.base_backoff)
+            else:
+                # Exponential backoff with full jitter
+                delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+            if status == 429:
+                stats["throttled"] += 1
+            stats["retries"] += 1
+            self._buckets[provider].block_for(delay)
+            self._cond.notify_all()
+            return True
+
+    def _completed(self, provider: str):
+        with self._cond:
+            self._stats[provider]["completed"] += 1
+
+    def submit(
+        self,
+        provider: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        priority: int = PRIORITY_NORMAL,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Call ``fn(*args, **kwargs)`` once ``provider``'s rate limit allows it.
+
+        Args:
+            provider (str): Key into ``Config.RATE_LIMITS``
+            fn (Callable): Function performing the request; it must raise on HTTP errors
+            priority (int): Lower values are served first
+
+        Returns:
+            Any: Whatever ``fn`` returns
+
+        Raises:
+            Exception: The last error once retries are exhausted or it is not retryable
+        """
+        attempt = 0
+        while True:
+            self._acquire(provider, priority)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(provider, e, attempt):
+                    raise
+                attempt += 1
+                continue
+            self._completed(provider)
+            return result
+
+    async def asubmit(
+        self,
+        provider: str,
+        fn: Callable[..., Awaitable[Any]],
+        *args: Any,
+        priority: int = PRIORITY_NORMAL,
+        **kwargs: Any,
+    ) -> Any:
+        """Async counterpart of ``submit`` for coroutine functions."""
+        attempt = 0
+        while True:
+            await self._aacquire(provider, priority)
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(provider, e, attempt):
+                    raise
+                attempt += 1
+                continue
+            self._completed(provider)
+            return result
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return per-provider counters along with the current queue depth."""
+        with self._cond:
+            return {
+                provider: dict(stats, queued=len(self._queues[provider]))
+                for provider, stats in self._stats.items()
+            }
+
+_shared_scheduler: Optional[RequestScheduler] = None
+_shared_lock = threading.Lock()
+
+def get_scheduler() -> RequestScheduler:
+    """Return the process-wide scheduler shared by every generator."""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = RequestScheduler()
+        return _shared_scheduler
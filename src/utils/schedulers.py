@@ -0,0 +1,48 @@
+from typing import Any, Dict, List
+import inspect
+import diffusers
+from .config import Config
+
+def scheduler_names() -> List[str]:
+    """Names of the schedulers configured in ``Config.SCHEDULERS``."""
+    return list(Config.SCHEDULERS.keys())
+
+def get_preset(name: str) -> Dict[str, Any]:
+    """Return the scheduler and step count of a preset from ``Config.SAMPLER_PRESETS``."""
+    if name not in Config.SAMPLER_PRESETS:
+        raise ValueError(f"Unknown sampler preset: {name}")
+    return Config.SAMPLER_PRESETS[name]
+
+def _uses_custom_sigmas(pipe: Any) -> bool:
+    # FLUX and Mochi pass their own sigma schedule to the flow-matching scheduler
+    return type(pipe.scheduler).__name__.startswith("FlowMatch")
+
+def with_scheduler(pipe: Any, name: str) -> Any:
+    """
+    Return a view of ``pipe`` that samples with the scheduler ``name``.
+
+    The view shares every model component with ``pipe`` and only swaps the
+    scheduler, so the resident pipeline in the registry is never modified.
+    For "default" the pipeline itself is returned. Calls still share the
+    pipeline's per-call state, so callers hold ``pipeline_lock(pipe)``.
+
+    Raises:
+        ValueError: If the scheduler is unknown or cannot drive this pipeline
+    """
+    if name not in Config.SCHEDULERS:
+        raise ValueError(f"Unknown scheduler: {name}")
+    spec = Config.SCHEDULERS[name]
+    if spec is None:
+        return pipe
+
+    scheduler_cls = getattr(diffusers, spec["class"])
+    if _uses_custom_sigmas(pipe):
+        accepted = inspect.signature(scheduler_cls.set_timesteps).parameters
+        if "sigmas" not in accepted:
+            raise ValueError(
+                f"Scheduler {name} cannot drive {type(pipe).__name__} with this diffusers version "
+                f"(its set_timesteps does not accept the pipeline's sigmas)"
+            )
+
+    scheduler = scheduler_cls.from_config(pipe.scheduler.config, **spec.get("config", {}))
+    return type(pipe)(**{**pipe.components, "scheduler": scheduler})
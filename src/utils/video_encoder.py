@@ -0,0 +1,126 @@
+from typing import Any, Optional
+import io
+import queue
+import threading
+import av
+import numpy as np
+from PIL import Image
+from .config import Config
+
+_DONE = object()
+
+def _to_rgb24(frame: Any) -> np.ndarray:
+    """Convert a PIL image or an HxWx3 float/uint8 array to a contiguous uint8 RGB array."""
+    if isinstance(frame, Image.Image):
+        return np.asarray(frame.convert("RGB"))
+    array = np.asarray(frame)
+    if array.dtype != np.uint8:
+        # Pipelines return floats in [0, 1] for output_type="np"
+        array = (np.clip(array, 0.0, 1.0) * 255).round().astype(np.uint8)
+    return np.ascontiguousarray(array[..., :3])
+
+class VideoEncoder:
+    """
+    Encodes frames to MP4 (H.264) or WebM (VP9) in memory on a background thread.
+
+    Frames are queued with ``write`` as soon as the caller has them, so
+    conversion and encoding overlap with whatever the caller does next;
+    ``finish`` waits for the remaining frames and returns the encoded bytes.
+    """
+
+    def __init__(self, container: Optional[str] = None, fps: Optional[int] = None):
+        self.container = container or Config.VIDEO_ENCODING_SETTINGS["container"]
+        if self.container not in Config.VIDEO_FORMATS:
+            raise ValueError(f"Unsupported video format: {self.container}")
+        self.fps = fps or Config.VIDEO_ENCODING_SETTINGS["fps"]
+        self.frames_written = 0
+        self._format = Config.VIDEO_FORMATS[self.container]
+        self._buffer = io.BytesIO()
+        # Bounded so a fast producer cannot pile up decoded frames in memory
+        self._queue: "queue.Queue[Any]" = queue.Queue(
+            maxsize=Config.VIDEO_ENCODING_SETTINGS["max_queued_frames"]
+        )
+        self._error: Optional[Exception] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def mime_type(self) -> str:
+        return self._format["mime"]
+
+    def write(self, frame: Any):
+        """Queue one frame (PIL image or HxWx3 array) for encoding."""
+        if self._error is not None:
+            raise Exception(f"Failed to encode video: {str(self._error)}")
+        self._queue.put(frame)
+
+    def _add_stream(self, output: Any, width: int, height: int) -> Any:
+        stream = output.add_stream(self._format["codec"], rate=self.fps)
+        # yuv420p needs even dimensions
+        stream.width = width - width % 2
+        stream.height = height - height % 2
+        stream.pix_fmt = "yuv420p"
+        stream.options = dict(self._format["options"])
+        return stream
+
+    def _run(self):
+        output = None
+        stream = None
+        done_seen = False
+        try:
+            output = av.open(self._buffer, mode="w", format=self.container)
+            while True:
+                frame = self._queue.get()
+                if frame is _DONE:
+                    done_seen = True
+                    break
+                array = _to_rgb24(frame)
+                if stream is None:
+                    stream = self._add_stream(output, array.shape[1], array.shape[0])
+                video_frame = av.VideoFrame.from_ndarray(
+                    np.ascontiguousarray(array[:stream.height, :stream.width]), format="rgb24"
+                )
+                for packet in stream.encode(video_frame):
+                    output.mux(packet)
+                self.frames_written += 1
+
+            if stream is not None:
+                for packet in stream.encode():
+                    output.mux(packet)
+
+        except Exception as e:
+            self._error = e
+            # Keep draining so a blocked ``write`` can return; the flush may fail after _DONE was read
+            while not done_seen:
+                done_seen = self._queue.get() is _DONE
+
+        finally:
+            if output is not None:
+                try:
+                    output.close()
+                except Exception as e:
+                    self._error = self._error or e
+
+    def finish(self) -> bytes:
+        """
+        Encode the remaining frames and return the finished video.
+
+        Returns:
+            bytes: The encoded MP4/WebM file
+
+        Raises:
+            Exception: If encoding failed or no frames were written
+        """
+        self._queue.put(_DONE)
+        self._thread.join()
+        if self._error is not None:
+            raise Exception(f"Failed to encode video: {str(self._error)}")
+        if not self.frames_written:
+            raise Exception("Failed to encode video: no frames were written")
+        return self._buffer.getvalue()
+
+    def close(self):
+        """Stop the encoder and discard its output, e.g. after the generation failed."""
+        if self._thread.is_alive():
+            self._queue.put(_DONE)
+            self._thread.join()